@@ -0,0 +1,56 @@
+class AudioRingBuffer:
+    """
+    Fixed-capacity byte ring buffer for raw PCM audio.
+
+    Every byte is stored twice, at ``i`` and ``i + capacity``, so the buffered audio is always available as one
+    contiguous ``memoryview`` without copying, however often the buffer has wrapped around.
+    """
+    def __init__(self, capacity):
+        assert capacity > 0, "Capacity must be a positive integer"
+        self.capacity = capacity
+        self.buffer = bytearray(2 * capacity)
+        self.start = 0
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def free(self):
+        return self.capacity - self.length
+
+    def append(self, data):
+        """Appends ``data``, discarding the oldest bytes if it does not fit. Returns the number of bytes discarded."""
+        data = memoryview(data).cast("B")
+        size = len(data)
+        dropped = max(self.length + size - self.capacity, 0)
+        if size > self.capacity:
+            self.clear()
+            data = data[size - self.capacity:]
+            size = self.capacity
+        else:
+            self.consume(dropped)
+
+        write_pos = (self.start + self.length) % self.capacity
+        first = min(size, self.capacity - write_pos)
+        self.buffer[write_pos:write_pos + first] = data[:first]
+        self.buffer[write_pos + self.capacity:write_pos + self.capacity + first] = data[:first]
+        if first < size:
+            rest = size - first
+            self.buffer[:rest] = data[first:]
+            self.buffer[self.capacity:self.capacity + rest] = data[first:]
+        self.length += size
+        return dropped
+
+    def consume(self, size):
+        """Discards up to ``size`` bytes from the start of the buffer."""
+        size = min(size, self.length)
+        self.start = (self.start + size) % self.capacity
+        self.length -= size
+
+    def view(self):
+        """Returns a zero-copy view of the buffered bytes, oldest first. Appends only overwrite it once they wrap past its start."""
+        return memoryview(self.buffer)[self.start:self.start + self.length]
+
+    def clear(self):
+        self.start = 0
+        self.length = 0
@@ -0,0 +1,118 @@
+import queue
+import threading
+import time
+from collections import deque
+import Metrics
+
+MAX_QUEUED_CHUNKS = 20
+MAX_CHUNK_DURATION = 30  # seconds of audio a slot holds at most when chunks are coalesced
+OVERFLOW_POLICIES = ("coalesce", "drop_oldest", "degrade")
+
+class AudioChannel:
+    """
+    Bounded channel of ``(data, time_spoken)`` chunks from a recorder to the transcriber.
+
+    Chunks wait in at most ``maxsize`` slots. When a chunk arrives while every slot is taken, ``policy`` decides what
+    happens:
+
+    - ``coalesce`` adds it to the newest slot, so no audio is lost, until that slot holds ``MAX_CHUNK_DURATION``
+      seconds of audio, after which the oldest slot is dropped instead. Chunks sharing a slot still come out one by one
+      with their own timestamps, so the transcriber finds the same phrase boundaries as without coalescing.
+    - ``drop_oldest`` drops the oldest slot, keeping the transcript close to real time at the cost of audio.
+    - ``degrade`` coalesces like ``coalesce``, and also sets ``degraded`` while the backlog drained last reached half
+      of ``maxsize``, telling the transcriber to switch to a faster decode until it catches up.
+
+    ``put`` never blocks, so the recorder callback is never held up by a slow transcriber. Every ``put`` notifies
+    ``scheduler``.
+    """
+    def __init__(self, scheduler, source, maxsize=MAX_QUEUED_CHUNKS, policy="coalesce", name=None):
+        assert maxsize > 0, "Maxsize must be a positive integer"
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy {policy!r}, expected one of: {', '.join(OVERFLOW_POLICIES)}")
+        self.scheduler = scheduler
+        self.maxsize = maxsize
+        self.policy = policy
+        self.max_chunk_bytes = MAX_CHUNK_DURATION * source.SAMPLE_RATE * source.SAMPLE_WIDTH * source.channels
+        self.high_watermark = max(1, maxsize // 2)
+        self.slots = deque()  # deques of (time put, data, time_spoken)
+        self.lock = threading.Lock()
+        self.peak = 0  # deepest the channel got since it was last found empty
+        self.degraded = False
+        self.dropped = 0
+        self.coalesced = 0
+
+        self.wait_seconds = Metrics.STAGE_SECONDS.labels("queue_wait")
+        self.dropped_chunks = Metrics.DROPPED_CHUNKS.labels("overflow")
+        self.cleared_chunks = Metrics.DROPPED_CHUNKS.labels("cleared")
+        if name is not None:
+            Metrics.QUEUE_DEPTH.labels(name).set_function(self.qsize)
+            self.coalesced_chunks = Metrics.COALESCED_CHUNKS.labels(name)
+        else:
+            self.coalesced_chunks = Metrics.Counter()
+
+    def put(self, chunk):
+        data, time_spoken = chunk
+        with self.lock:
+            if len(self.slots) >= self.maxsize:
+                self.handle_overflow(data, time_spoken)
+            else:
+                self.slots.append(deque([(time.perf_counter(), data, time_spoken)]))
+            self.peak = max(self.peak, len(self.slots))
+        self.scheduler.notify()
+
+    def handle_overflow(self, data, time_spoken):
+        newest = self.slots[-1]
+        newest_bytes = sum(len(queued) for _, queued, _ in newest)
+        if self.policy != "drop_oldest" and newest_bytes + len(data) <= self.max_chunk_bytes:
+            newest.append((time.perf_counter(), data, time_spoken))
+            self.coalesced += 1
+            self.coalesced_chunks.inc()
+            return
+        dropped = self.slots.popleft()
+        self.slots.append(deque([(time.perf_counter(), data, time_spoken)]))
+        self.dropped += len(dropped)
+        self.dropped_chunks.inc(len(dropped))
+
+    def get_nowait(self):
+        with self.lock:
+            if not self.slots:
+                if self.policy == "degrade":
+                    self.degraded = self.peak >= self.high_watermark
+                self.peak = 0
+                raise queue.Empty
+            oldest = self.slots[0]
+            put_time, data, time_spoken = oldest.popleft()
+            if not oldest:
+                self.slots.popleft()
+        self.wait_seconds.observe(time.perf_counter() - put_time)
+        return data, time_spoken
+
+    def clear(self):
+        """Discards every queued chunk and returns how many there were."""
+        with self.lock:
+            cleared = sum(len(slot) for slot in self.slots)
+            self.slots.clear()
+            self.peak = 0
+            self.degraded = False
+        self.cleared_chunks.inc(cleared)
+        return cleared
+
+    def qsize(self):
+        return len(self.slots)
+
+    def __len__(self):
+        return len(self.slots)
+
+    def empty(self):
+        return not self.slots
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                "depth": len(self.slots),
+                "maxsize": self.maxsize,
+                "policy": self.policy,
+                "dropped": self.dropped,
+                "coalesced": self.coalesced,
+                "degraded": self.degraded,
+            }
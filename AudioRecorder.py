@@ -1,21 +1,37 @@
 import custom_speech_recognition as sr
-import pyaudiowpatch as pyaudio
+import threading
+import time
 from datetime import datetime
+import Metrics
+from ReplaySource import ReplaySource
 
 RECORD_TIMEOUT = 3
 ENERGY_THRESHOLD = 1000
 DYNAMIC_ENERGY_THRESHOLD = False
+CAPTURE_SAMPLE_RATE = 16000
+BUFFER_LATENCY = 0.025
+
+def get_chunk_size(sample_rate, latency=BUFFER_LATENCY):
+    return max(1, int(sample_rate * latency))
 
 class BaseRecorder:
-    def __init__(self, source):
+    def __init__(self, source, device_name, calibration_msg, clock=None):
         self.recorder = sr.Recognizer()
         self.recorder.energy_threshold = ENERGY_THRESHOLD
         self.recorder.dynamic_energy_threshold = DYNAMIC_ENERGY_THRESHOLD
+        self.record_timeout = RECORD_TIMEOUT
+        # timestamps the recorded audio, live devices use the wall clock
+        self.clock = clock or datetime.utcnow
+        self.stop_listening = None
+        # set once a recording has been played to the end and every phrase in it has been queued
+        self.finished = threading.Event()
 
         if source is None:
             raise ValueError("audio source can't be None")
 
         self.source = source
+        self.device_name = device_name
+        self.calibration_msg = calibration_msg
 
     def adjust_for_noise(self, device_name, msg):
         print(f"[INFO] Adjusting for ambient noise from {device_name}. " + msg)
@@ -24,19 +40,49 @@ class BaseRecorder:
         print(f"[INFO] Completed ambient noise adjustment for {device_name}.")
 
     def record_into_queue(self, audio_queue):
+        record_seconds = Metrics.STAGE_SECONDS.labels("record")
+        recorded_audio = Metrics.AUDIO_SECONDS.labels("recorded")
+        bytes_per_second = self.source.SAMPLE_RATE * self.source.SAMPLE_WIDTH * self.source.channels
+
         def record_callback(_, audio:sr.AudioData) -> None:
+            start = time.perf_counter()
             data = audio.get_raw_data()
-            audio_queue.put((data, datetime.utcnow()))
+            if data:
+                audio_queue.put((data, self.clock()))
+                record_seconds.observe(time.perf_counter() - start)
+                recorded_audio.inc(len(data) / bytes_per_second)
+            else:  # only recordings run out of audio
+                self.finished.set()
+
+        self.stop_listening = self.recorder.listen_in_background(self.source, record_callback,
+                                                                 phrase_time_limit=self.record_timeout)
+
+    def calibrate_and_record(self, audio_queue, calibrate=True):
+        if calibrate:
+            self.adjust_for_noise(self.device_name, self.calibration_msg)
+        self.record_into_queue(audio_queue)
 
-        self.recorder.listen_in_background(self.source, record_callback, phrase_time_limit=RECORD_TIMEOUT)
+    def start(self, audio_queue, calibrate=True):
+        thread = threading.Thread(target=self.calibrate_and_record, args=(audio_queue, calibrate), daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        if self.stop_listening is not None:
+            self.stop_listening(wait_for_stop=False)
+            self.stop_listening = None
 
 class DefaultMicRecorder(BaseRecorder):
     def __init__(self):
-        super().__init__(source=sr.Microphone(sample_rate=16000))
-        self.adjust_for_noise("Default Mic", "Please make some noise from the Default Mic...")
+        super().__init__(source=sr.Microphone(sample_rate=CAPTURE_SAMPLE_RATE,
+                                              chunk_size=get_chunk_size(CAPTURE_SAMPLE_RATE)),
+                         device_name="Default Mic",
+                         calibration_msg="Please make some noise from the Default Mic...")
 
 class DefaultSpeakerRecorder(BaseRecorder):
     def __init__(self):
+        import pyaudiowpatch as pyaudio
+
         with pyaudio.PyAudio() as p:
             wasapi_info = p.get_host_api_info_by_type(pyaudio.paWASAPI)
             default_speakers = p.get_device_info_by_index(wasapi_info["defaultOutputDevice"])
@@ -52,7 +98,19 @@ class DefaultSpeakerRecorder(BaseRecorder):
         source = sr.Microphone(speaker=True,
                                device_index= default_speakers["index"],
                                sample_rate=int(default_speakers["defaultSampleRate"]),
-                               chunk_size=pyaudio.get_sample_size(pyaudio.paInt16),
-                               channels=default_speakers["maxInputChannels"])
-        super().__init__(source=source)
-        self.adjust_for_noise("Default Speaker", "Please make or play some noise from the Default Speaker...")
\ No newline at end of file
+                               chunk_size=get_chunk_size(int(default_speakers["defaultSampleRate"])),
+                               channels=default_speakers["maxInputChannels"],
+                               target_sample_rate=CAPTURE_SAMPLE_RATE)
+        super().__init__(source=source,
+                         device_name="Default Speaker",
+                         calibration_msg="Please make or play some noise from the Default Speaker...")
+
+class FileRecorder(BaseRecorder):
+    """Records a WAV file instead of a device, timestamping the audio with its position in the recording. See ``ReplaySource`` for ``speed``."""
+    def __init__(self, path, device_name, start_time=None, speed=None):
+        source = ReplaySource(path, sample_rate=CAPTURE_SAMPLE_RATE, latency=BUFFER_LATENCY, start_time=start_time,
+                              speed=speed)
+        super().__init__(source=source,
+                         device_name=device_name,
+                         calibration_msg="Calibrating on the start of the recording...",
+                         clock=source.get_time)
@@ -1,154 +1,468 @@
-import wave
-import os
-import threading
-import tempfile
-import custom_speech_recognition as sr
-import io
-from datetime import timedelta
-import pyaudiowpatch as pyaudio
-from heapq import merge
+import queue
+import numpy as np
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from AudioBuffer import AudioRingBuffer
+from TranscriptionScheduler import TranscriptionScheduler
+from TranscriptStore import TranscriptStore
+from TranscriptIndex import TranscriptIndex
+from custom_speech_recognition import dsp
+import Metrics
+from datetime import datetime, timedelta
+import string
+import time
 
 PHRASE_TIMEOUT = 3.05
 MAX_PHRASES = 10
+MAX_PHRASE_DURATION = 30
+
+STREAMING_OVERLAP = 0.2
+STREAMING_MAX_BUFFER = 15
+STREAMING_PROMPT_LENGTH = 200
+
+WHISPER_SAMPLE_RATE = 16000
+
+# silence gating, energies are the RMS of 16-bit samples over the buffers the source is read in, like the recorder's
+GATE_FRAME_DURATION = 0.02  # for sources that don't say how long their buffers are
+SILENCE_THRESHOLD = 150  # frames quieter than this are never speech
+SPEECH_THRESHOLD = 1000  # frames above the recorder's energy threshold always are, this one without a recorder
+SPEECH_TO_NOISE = 3  # in between, frames must be this many times louder than the source's noise floor
+NOISE_FLOOR_RISE = 0.1  # the floor follows quieter audio at once, and louder audio slowly
+TRIM_PADDING = 0.3  # seconds of silence kept around the speech, so that word onsets and endings aren't cut
 
 class AudioTranscriber:
-    def __init__(self, mic_source, speaker_source, model):
-        self.transcript_data = {"You": [], "Speaker": []}
-        self.transcript_changed_event = threading.Event()
+    def __init__(self, mic_source, speaker_source, model, streaming=False, scheduler=None, workers=0, batched=False,
+                 log=None, phrase_timeout=PHRASE_TIMEOUT, recognizers=None, clock=None):
+        self.transcript = TranscriptStore(("You", "Speaker"), MAX_PHRASES, log)
+        self.search_index = TranscriptIndex()
+        self.scheduler = scheduler or TranscriptionScheduler()
+        self.use_streaming = streaming
+        self.use_batching = batched
+        self.set_model(model)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="transcriber") if workers > 0 else None
+        self.in_flight = Counter()
+        self.completed_jobs = queue.Queue()
+        self.phrase_timeout = timedelta(seconds=phrase_timeout)
+        # the time in the recorders' timestamps, to end phrases after which no audio arrived
+        self.clock = clock or datetime.utcnow
+        self.stopping = False
+        self.clear_requested = False
+        self.prepare_seconds = Metrics.STAGE_SECONDS.labels("prepare")
+        self.inference_seconds = Metrics.STAGE_SECONDS.labels("inference")
+        self.transcribed_audio = Metrics.AUDIO_SECONDS.labels("transcribed")
+        self.inference_rtf = Metrics.INFERENCE_RTF.labels()
+        self.failed_chunks = Metrics.DROPPED_CHUNKS.labels("transcription_error")
+        self.gated_audio = Metrics.AUDIO_SECONDS.labels("gated")
+        self.trimmed_audio = Metrics.AUDIO_SECONDS.labels("trimmed")
+        self.gated_seconds = 0.0
+        self.trimmed_seconds = 0.0
+        # either source can be None, e.g. when transcribing a single recording. ``recognizers`` holds the recognizer
+        # that records each source, whose energy threshold decides what audio it hands over as speech
+        recognizers = recognizers or {}
+        self.audio_sources = {who_spoke: create_source_info(source, recognizers.get(who_spoke))
+                              for who_spoke, source in (("You", mic_source), ("Speaker", speaker_source))
+                              if source is not None}
+
+    def set_model(self, model):
         self.audio_model = model
-        self.audio_sources = {
-            "You": {
-                "sample_rate": mic_source.SAMPLE_RATE,
-                "sample_width": mic_source.SAMPLE_WIDTH,
-                "channels": mic_source.channels,
-                "last_sample": bytes(),
-                "last_spoken": None,
-                "new_phrase": True,
-                "process_data_func": self.process_mic_data
-            },
-            "Speaker": {
-                "sample_rate": speaker_source.SAMPLE_RATE,
-                "sample_width": speaker_source.SAMPLE_WIDTH,
-                "channels": speaker_source.channels,
-                "last_sample": bytes(),
-                "last_spoken": None,
-                "new_phrase": True,
-                "process_data_func": self.process_speaker_data
-            }
-        }
+        self.streaming = self.use_streaming and hasattr(model, "get_segments")
+        self.batched = self.use_batching and hasattr(model, "get_batch_transcriptions")
+        self.fast_decode = False
 
     def transcribe_audio_queue(self, speaker_queue, mic_queue):
-        import queue
-        
+        audio_queues = {"You": mic_queue, "Speaker": speaker_queue}
+        timeout = None
+        while True:
+            self.scheduler.wait(timeout)
+            self.clear_if_requested()
+            for who_spoke in self.audio_sources:
+                self.drain_audio_queue(who_spoke, audio_queues[who_spoke])
+            self.update_decode_speed(audio_queues[who_spoke] for who_spoke in self.audio_sources)
+            self.commit_transcriptions()
+            self.submit_transcriptions(self.audio_sources)
+            self.commit_transcriptions()
+            timeout = self.finish_silent_phrases()
+
+            if self.stopping and self.is_idle(audio_queues[who_spoke] for who_spoke in self.audio_sources):
+                break
+
+    def stop(self):
+        """Makes ``transcribe_audio_queue`` return once everything already queued has been transcribed."""
+        self.stopping = True
+        self.scheduler.notify()
+
+    def is_idle(self, audio_queues):
+        return (all(audio_queue.empty() for audio_queue in audio_queues) and not self.in_flight
+                and self.completed_jobs.empty()
+                and not any(source_info["pending_time"] or source_info["final_jobs"]
+                            for source_info in self.audio_sources.values()))
+
+    def update_decode_speed(self, audio_queues):
+        """Switches the model to a faster decode while an audio channel with the ``degrade`` policy is backed up."""
+        fast_decode = any(audio_queue.degraded for audio_queue in audio_queues)
+        if fast_decode != self.fast_decode and hasattr(self.audio_model, "set_fast_decode"):
+            self.audio_model.set_fast_decode(fast_decode)
+            self.fast_decode = fast_decode
+            print(f"[INFO] Transcription {'is falling behind, using' if fast_decode else 'caught up, leaving'} "
+                  f"the faster decode.")
+
+    def drain_audio_queue(self, who_spoke, audio_queue):
         while True:
-            pending_transcriptions = []
-            
-            mic_data = []
-            while True:
-                try:
-                    data, time_spoken = mic_queue.get_nowait()
-                    self.update_last_sample_and_phrase_status("You", data, time_spoken)
-                    mic_data.append((data, time_spoken))
-                except queue.Empty:
-                    break
-                    
-            speaker_data = []
-            while True:
-                try:
-                    data, time_spoken = speaker_queue.get_nowait()
-                    self.update_last_sample_and_phrase_status("Speaker", data, time_spoken)
-                    speaker_data.append((data, time_spoken))
-                except queue.Empty:
-                    break
-            
-            if mic_data:
-                source_info = self.audio_sources["You"]
-                try:
-                    fd, path = tempfile.mkstemp(suffix=".wav")
-                    os.close(fd)
-                    source_info["process_data_func"](source_info["last_sample"], path)
-                    text = self.audio_model.get_transcription(path)
-                    if text != '' and text.lower() != 'you':
-                        latest_time = max(time for _, time in mic_data)
-                        pending_transcriptions.append(("You", text, latest_time))
-                except Exception as e:
-                    print(f"Transcription error for You: {e}")
-                finally:
-                    os.unlink(path)
-            
-            if speaker_data:
-                source_info = self.audio_sources["Speaker"]
-                try:
-                    fd, path = tempfile.mkstemp(suffix=".wav")
-                    os.close(fd)
-                    source_info["process_data_func"](source_info["last_sample"], path)
-                    text = self.audio_model.get_transcription(path)
-                    if text != '' and text.lower() != 'you':
-                        latest_time = max(time for _, time in speaker_data)
-                        pending_transcriptions.append(("Speaker", text, latest_time))
-                except Exception as e:
-                    print(f"Transcription error for Speaker: {e}")
-                finally:
-                    os.unlink(path)
-            
-            if pending_transcriptions:
-                pending_transcriptions.sort(key=lambda x: x[2])
-                for who_spoke, text, time_spoken in pending_transcriptions:
-                    self.update_transcript(who_spoke, text, time_spoken)
-                
-                self.transcript_changed_event.set()
-            
-            threading.Event().wait(0.1)
+            try:
+                data, time_spoken = audio_queue.get_nowait()
+            except queue.Empty:
+                break
+            source_info = self.audio_sources[who_spoke]
+            if (source_info["pending_time"] and self.starts_new_phrase(who_spoke, data, time_spoken)
+                    and not self.gate_silence(who_spoke)):
+                # the phrase is about to be dropped with audio that was never transcribed, this happens when audio
+                # arrives faster than it is transcribed, e.g. when transcribing a recording. Its final job takes that
+                # audio along and waits for the source's job in flight, if there is one
+                source_info["final_jobs"].append(self.create_job(who_spoke, final=True))
+                self.submit_transcriptions([who_spoke])
+            self.update_last_sample_and_phrase_status(who_spoke, data, time_spoken)
+            self.measure_speech(who_spoke, data)
+            source_info["pending_time"] = time_spoken
+            source_info["pending_chunks"] += 1
+            source_info["pending_bytes"] += len(data)
+
+    def measure_speech(self, who_spoke, data):
+        """Updates the source's noise floor with ``data``, and notes whether ``data`` contains speech."""
+        source_info = self.audio_sources[who_spoke]
+        energies = dsp.rms_frames(data, source_info["sample_width"], source_info["frame_size"] * source_info["channels"])
+        if len(energies) == 0:
+            source_info["pending_speech"] = True  # too short to tell
+            return
+        # most recorded chunks end with the pause that ended them, their quietest frames are the background noise,
+        # but chunks cut by the record timeout in the middle of speech must not raise the floor much
+        floor = float(np.percentile(energies, 10))
+        previous = source_info["noise_floor"]
+        if previous is not None and floor > previous:
+            floor = previous + NOISE_FLOOR_RISE * (floor - previous)
+        source_info["noise_floor"] = floor
+        if energies.max() >= self.get_speech_threshold(who_spoke):
+            source_info["pending_speech"] = True
+
+    def get_speech_threshold(self, who_spoke):
+        source_info = self.audio_sources[who_spoke]
+        noise_floor = source_info["noise_floor"] or 0
+        recognizer = source_info["recognizer"]
+        # read on every call, calibration and dynamic thresholds change it while recording. Audio the recorder took
+        # for speech is never gated, and rms_frames can be one below the recognizer's rms
+        speech_threshold = recognizer.energy_threshold - 1 if recognizer is not None else SPEECH_THRESHOLD
+        return min(max(SILENCE_THRESHOLD, SPEECH_TO_NOISE * noise_floor), speech_threshold)
+
+    def gate_silence(self, who_spoke):
+        """
+        Skips transcribing the audio that arrived since the last transcription if none of it is speech, in which case
+        the transcript of the phrase can't change. Returns whether the audio was skipped.
+        """
+        source_info = self.audio_sources[who_spoke]
+        if source_info["pending_speech"]:
+            return False
+        seconds = source_info["pending_bytes"] / (source_info["sample_rate"] * source_info["sample_width"]
+                                                  * source_info["channels"])
+        self.gated_seconds += seconds
+        self.gated_audio.inc(seconds)
+        self.clear_pending(who_spoke)
+        return True
+
+    def clear_pending(self, who_spoke):
+        source_info = self.audio_sources[who_spoke]
+        source_info["pending_time"] = None
+        source_info["pending_chunks"] = 0
+        source_info["pending_bytes"] = 0
+        source_info["pending_speech"] = False
+
+    def create_job(self, who_spoke, final=False):
+        source_info = self.audio_sources[who_spoke]
+        job = {
+            "who_spoke": who_spoke,
+            "phrase": source_info["phrase"],
+            "time_spoken": source_info["pending_time"],
+            "duration": self.get_sample_duration(who_spoke),
+            "chunks": source_info["pending_chunks"],
+            "prompt": source_info["committed_text"][-STREAMING_PROMPT_LENGTH:] or None,
+            "final": final,
+            "committed_text": source_info["committed_text"],
+            "overlap": source_info["overlap"],
+        }
+        with self.prepare_seconds.time():
+            job["audio"], job["offset"] = self.trim_silence(who_spoke, self.get_audio_array(who_spoke))
+        self.clear_pending(who_spoke)
+        return job
+
+    def trim_silence(self, who_spoke, audio):
+        """
+        Cuts the silence before the first and after the last speech in ``audio``, but ``TRIM_PADDING``, since inference
+        time grows with the length of the audio. Returns the audio and the seconds cut from its start.
+        """
+        source_info = self.audio_sources[who_spoke]
+        frame_size = max(1, source_info["frame_size"] * WHISPER_SAMPLE_RATE // source_info["sample_rate"])
+        frames = audio[:len(audio) - len(audio) % frame_size].reshape(-1, frame_size)
+        speech = np.flatnonzero(np.sqrt(np.einsum("ij,ij->i", frames, frames) / frame_size) * 32768
+                                >= self.get_speech_threshold(who_spoke))
+        if len(speech) == 0:
+            return audio, 0.0
+        padding = int(TRIM_PADDING * WHISPER_SAMPLE_RATE)
+        start = max(speech[0] * frame_size - padding, 0)
+        end = min((speech[-1] + 1) * frame_size + padding, len(audio))
+        seconds = (len(audio) - (end - start)) / WHISPER_SAMPLE_RATE
+        self.trimmed_seconds += seconds
+        self.trimmed_audio.inc(seconds)
+        return audio[start:end], start / WHISPER_SAMPLE_RATE
+
+    def submit_transcriptions(self, sources):
+        """
+        Submits the next job of each of ``sources``: the oldest final job of a phrase that ended, or else the audio that
+        arrived since the last transcription. A source has at most one job in flight, so that its results are committed
+        in the order its audio was spoken, and a late result never overwrites a newer one.
+        """
+        jobs = []
+        for who_spoke in sources:
+            source_info = self.audio_sources[who_spoke]
+            if who_spoke in self.in_flight:
+                continue
+            if source_info["final_jobs"]:
+                jobs.append(source_info["final_jobs"].popleft())
+            elif source_info["pending_time"] and not self.gate_silence(who_spoke):
+                jobs.append(self.create_job(who_spoke))
+        if not jobs:
+            return
+        batches = [jobs] if self.batched else [[job] for job in jobs]
+
+        for batch in batches:
+            if self.executor is None:
+                self.complete_transcriptions(batch, self.run_transcriptions(batch))
+            else:
+                self.in_flight.update(job["who_spoke"] for job in batch)
+                future = self.executor.submit(self.run_transcriptions, batch)
+                future.add_done_callback(lambda f, batch=batch: self.complete_transcriptions(batch, f.result()))
+
+    def run_transcriptions(self, jobs):
+        start = time.perf_counter()
+        try:
+            return self.transcribe_jobs(jobs)
+        except Exception as e:
+            print(f"Transcription error for {', '.join(job['who_spoke'] for job in jobs)}: {e}")
+            self.failed_chunks.inc(sum(job["chunks"] for job in jobs))
+            return [None] * len(jobs)
+        finally:
+            elapsed = time.perf_counter() - start
+            audio_seconds = sum(len(job["audio"]) for job in jobs) / WHISPER_SAMPLE_RATE
+            self.inference_seconds.observe(elapsed)
+            self.transcribed_audio.inc(audio_seconds)
+            if audio_seconds:
+                self.inference_rtf.observe(elapsed / audio_seconds)
+
+    def transcribe_jobs(self, jobs):
+        audios = [job["audio"] for job in jobs]
+        if len(jobs) > 1 and self.streaming:
+            return self.audio_model.get_batch_segments(audios, [job["prompt"] for job in jobs])
+        if len(jobs) > 1:
+            return self.audio_model.get_batch_transcriptions(audios)
+        if self.streaming:
+            return [self.audio_model.get_segments(audios[0], initial_prompt=jobs[0]["prompt"])]
+        return [self.audio_model.get_transcription(audios[0])]
+
+    def complete_transcriptions(self, jobs, results):
+        for job, result in zip(jobs, results):
+            self.completed_jobs.put((job, result))
+        if self.executor is not None:
+            self.scheduler.notify()
+
+    def commit_transcriptions(self):
+        # a clear requested during a transcription must drop its result
+        self.clear_if_requested()
+        completed = []
+        while True:
+            try:
+                completed.append(self.completed_jobs.get_nowait())
+            except queue.Empty:
+                break
+        if not completed:
+            return
+
+        completed.sort(key=lambda x: x[0]["time_spoken"])
+        for job, result in completed:
+            who_spoke = job["who_spoke"]
+            if self.in_flight[who_spoke] > 0:
+                self.in_flight[who_spoke] -= 1
+                if self.in_flight[who_spoke] == 0:
+                    del self.in_flight[who_spoke]
+            if result is None:
+                continue
+            text = self.finish_streaming(job, result) if self.streaming else result
+            if text != '' and text.lower() != 'you':
+                self.update_transcript(who_spoke, text, job["time_spoken"], job["phrase"])
+
+    def finish_silent_phrases(self):
+        """
+        Ends the phrase of every source that has been silent for longer than the phrase timeout and is transcribed, and
+        finishes its segment in the transcript, rather than waiting for the source to speak again. Returns the seconds
+        until the next phrase times out, or None.
+        """
+        now = self.clock()
+        timeout = None
+        for who_spoke, source_info in self.audio_sources.items():
+            if (not source_info["last_sample"] or who_spoke in self.in_flight or source_info["pending_time"]
+                    or source_info["final_jobs"]):
+                continue  # no phrase, or one whose transcription completes later and wakes the scheduler
+            remaining = (source_info["last_spoken"] + self.phrase_timeout - now).total_seconds()
+            if remaining < 0:
+                self.transcript.finish_last(who_spoke)
+                self.reset_phrase(who_spoke)
+            elif timeout is None or remaining < timeout:
+                timeout = remaining
+        return timeout
+
+    def get_audio_array(self, who_spoke):
+        source_info = self.audio_sources[who_spoke]
+        return pcm_to_float32(source_info["last_sample"].view(), source_info["sample_rate"],
+                              source_info["sample_width"], source_info["channels"])
+
+    def finish_streaming(self, job, segments):
+        source_info = self.audio_sources[job["who_spoke"]]
+        # timestamps count from the start of the phrase buffer, before trim_silence cut its leading silence
+        segments = [(start + job["offset"], end + job["offset"], text) for start, end, text in segments]
+        # segments centred inside the overlap re-transcribe audio that is already committed
+        segments = [segment for segment in segments if (segment[0] + segment[1]) / 2 >= job["overlap"]]
+        if job["final"] or job["phrase"] != source_info["phrase"]:
+            # when the phrase ended while the job was in flight, the job transcribed its last audio, unless the
+            # phrase's final job follows, which then replaces this text
+            return " ".join([job["committed_text"]] + [segment[2] for segment in segments]).strip()
+        committed_text = source_info["committed_text"]
+
+        previous = source_info["hypothesis"]
+        agreed = 0
+        while (agreed < min(len(previous), len(segments))
+               and normalize_text(previous[agreed]) == normalize_text(segments[agreed][2])):
+            agreed += 1
+
+        if agreed == 0 and len(segments) > 1 and job["duration"] > STREAMING_MAX_BUFFER:
+            agreed = len(segments) - 1
+
+        if agreed > 0:
+            committed_text = " ".join(
+                [committed_text] + [segment[2] for segment in segments[:agreed]]).strip()
+            source_info["committed_text"] = committed_text
+            self.trim_last_sample(job["who_spoke"], segments[agreed - 1][1])
+
+        source_info["hypothesis"] = [segment[2] for segment in segments[agreed:]]
+        return " ".join([committed_text] + source_info["hypothesis"]).strip()
+
+    def trim_last_sample(self, who_spoke, cut_time):
+        source_info = self.audio_sources[who_spoke]
+        keep_from = max(cut_time - STREAMING_OVERLAP, 0)
+        frame_size = source_info["sample_width"] * source_info["channels"]
+        trim_bytes = int(keep_from * source_info["sample_rate"]) * frame_size
+        source_info["last_sample"].consume(trim_bytes)
+        source_info["overlap"] = cut_time - trim_bytes / (frame_size * source_info["sample_rate"])
+
+    def get_sample_duration(self, who_spoke):
+        source_info = self.audio_sources[who_spoke]
+        frame_size = source_info["sample_width"] * source_info["channels"]
+        return len(source_info["last_sample"]) / (frame_size * source_info["sample_rate"])
+
+    def reset_phrase(self, who_spoke):
+        source_info = self.audio_sources[who_spoke]
+        source_info["last_sample"].clear()
+        source_info["phrase"] += 1
+        source_info["committed_text"] = ""
+        source_info["hypothesis"] = []
+        source_info["overlap"] = 0
+
+    def starts_new_phrase(self, who_spoke, data, time_spoken):
+        source_info = self.audio_sources[who_spoke]
+        phrase_timed_out = source_info["last_spoken"] and time_spoken - source_info["last_spoken"] > self.phrase_timeout
+        return phrase_timed_out or len(data) > source_info["last_sample"].free()
 
     def update_last_sample_and_phrase_status(self, who_spoke, data, time_spoken):
         source_info = self.audio_sources[who_spoke]
-        if source_info["last_spoken"] and time_spoken - source_info["last_spoken"] > timedelta(seconds=PHRASE_TIMEOUT):
-            source_info["last_sample"] = bytes()
-            source_info["new_phrase"] = True
-        else:
-            source_info["new_phrase"] = False
+        if self.starts_new_phrase(who_spoke, data, time_spoken):
+            self.reset_phrase(who_spoke)
 
-        source_info["last_sample"] += data
+        source_info["last_sample"].append(data)
         source_info["last_spoken"] = time_spoken 
 
-    def process_mic_data(self, data, temp_file_name):
-        audio_data = sr.AudioData(data, self.audio_sources["You"]["sample_rate"], self.audio_sources["You"]["sample_width"])
-        wav_data = io.BytesIO(audio_data.get_wav_data())
-        with open(temp_file_name, 'w+b') as f:
-            f.write(wav_data.read())
-
-    def process_speaker_data(self, data, temp_file_name):
-        with wave.open(temp_file_name, 'wb') as wf:
-            wf.setnchannels(self.audio_sources["Speaker"]["channels"])
-            p = pyaudio.PyAudio()
-            wf.setsampwidth(p.get_sample_size(pyaudio.paInt16))
-            wf.setframerate(self.audio_sources["Speaker"]["sample_rate"])
-            wf.writeframes(data)
-
-    def update_transcript(self, who_spoke, text, time_spoken):
+    def update_transcript(self, who_spoke, text, time_spoken, phrase=None):
         source_info = self.audio_sources[who_spoke]
-        transcript = self.transcript_data[who_spoke]
+        if phrase is None:
+            phrase = source_info["phrase"]
 
-        if source_info["new_phrase"] or len(transcript) == 0:
-            if len(transcript) > MAX_PHRASES:
-                transcript.pop(-1)
-            transcript.insert(0, (f"{who_spoke}: [{text}]\n\n", time_spoken))
+        # a source's results arrive in the order its phrases were spoken, so only results of phrases that were
+        # cleared are older than the transcript
+        if phrase < source_info["transcript_phrase"]:
+            return
+        if phrase > source_info["transcript_phrase"] or self.transcript.is_empty(who_spoke):
+            segment = self.transcript.add(who_spoke, text, time_spoken)
+            source_info["transcript_phrase"] = phrase
         else:
-            transcript[0] = (f"{who_spoke}: [{text}]\n\n", time_spoken)
+            segment = self.transcript.replace_last(who_spoke, text, time_spoken)
+        self.search_index.update(segment)
 
     def get_transcript(self):
-        combined_transcript = list(merge(
-            self.transcript_data["You"], self.transcript_data["Speaker"], 
-            key=lambda x: x[1], reverse=True))
-        combined_transcript = combined_transcript[:MAX_PHRASES]
-        return "".join([t[0] for t in combined_transcript])
+        return self.transcript.get_text()
     
     def clear_transcript_data(self):
-        self.transcript_data["You"].clear()
-        self.transcript_data["Speaker"].clear()
+        """
+        Clears the transcript and the current phrases. Only the transcription thread touches the phrase buffers, so
+        this only asks it to, and returns before the transcript is cleared.
+        """
+        self.clear_requested = True
+        self.scheduler.notify()
+
+    def clear_if_requested(self):
+        if not self.clear_requested:
+            return
+        self.clear_requested = False
+        self.transcript.clear()
 
-        self.audio_sources["You"]["last_sample"] = bytes()
-        self.audio_sources["Speaker"]["last_sample"] = bytes()
+        for who_spoke, source_info in self.audio_sources.items():
+            self.reset_phrase(who_spoke)
+            self.clear_pending(who_spoke)
+            source_info["final_jobs"].clear()
+            source_info["transcript_phrase"] = source_info["phrase"]
+
+def create_source_info(source, recognizer=None):
+    return {
+        "sample_rate": source.SAMPLE_RATE,
+        "sample_width": source.SAMPLE_WIDTH,
+        "channels": source.channels,
+        # frames per buffer read from the source, the recognizer measures the energy of each buffer
+        "frame_size": getattr(source, "CHUNK", None) or max(1, int(source.SAMPLE_RATE * GATE_FRAME_DURATION)),
+        "recognizer": recognizer,
+        "last_sample": AudioRingBuffer(MAX_PHRASE_DURATION * source.SAMPLE_RATE
+                                       * source.SAMPLE_WIDTH * source.channels),
+        "last_spoken": None,
+        "phrase": 0,
+        "transcript_phrase": 0,
+        "pending_time": None,
+        "pending_chunks": 0,
+        "pending_bytes": 0,
+        "pending_speech": False,
+        "final_jobs": deque(),  # jobs of ended phrases, waiting for the source's job in flight
+        "noise_floor": None,
+        "committed_text": "",
+        "hypothesis": [],
+        "overlap": 0
+    }
+
+def pcm_to_float32(data, sample_rate, sample_width, channels):
+    if sample_width != 2:
+        raise ValueError(f"unsupported sample width: {sample_width}")
+    audio = np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0
+    if channels > 1:
+        audio = audio[:len(audio) - len(audio) % channels].reshape(-1, channels).mean(axis=1)
+    if sample_rate != WHISPER_SAMPLE_RATE:
+        if sample_rate % WHISPER_SAMPLE_RATE == 0:
+            factor = sample_rate // WHISPER_SAMPLE_RATE
+            audio = audio[:len(audio) - len(audio) % factor].reshape(-1, factor).mean(axis=1)
+        else:
+            duration = len(audio) / sample_rate
+            positions = np.arange(int(duration * WHISPER_SAMPLE_RATE)) * (sample_rate / WHISPER_SAMPLE_RATE)
+            audio = np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+    return audio
 
-        self.audio_sources["You"]["new_phrase"] = True
-        self.audio_sources["Speaker"]["new_phrase"] = True
\ No newline at end of file
+def normalize_text(text):
+    return text.lower().translate(str.maketrans("", "", string.punctuation)).strip()
\ No newline at end of file
@@ -0,0 +1,239 @@
+import json
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STAGE_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                 0.25, 0.5, 1, 2.5, 5, 10, 30)
+RTF_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 0.75, 1, 1.5, 2, 5, 10)
+QUANTILES = (0.5, 0.95, 0.99)
+
+class Counter:
+    def __init__(self):
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def get_value(self):
+        return {"value": self.value}
+
+class Gauge:
+    """A value read when the metrics are collected, from ``function`` if one is set."""
+    def __init__(self):
+        self.value = 0.0
+        self.function = None
+
+    def set(self, value):
+        self.value = value
+
+    def set_function(self, function):
+        self.function = function
+
+    def get_value(self):
+        return {"value": self.function() if self.function is not None else self.value}
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last one counts values above every bucket
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    def time(self):
+        return Timer(self)
+
+    def get_value(self):
+        with self.lock:
+            counts, total = list(self.counts), self.sum
+        count = sum(counts)
+        value = {"count": count, "sum": total, "mean": total / count if count else None,
+                 "buckets": dict(zip([str(bound) for bound in self.buckets] + ["+Inf"], counts))}
+        for q in QUANTILES:
+            value[f"p{round(q * 100)}"] = estimate_quantile(self.buckets, counts, q)
+        return value
+
+class Timer:
+    """Context manager that observes how long its block took."""
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+class Metric:
+    """A family of counters, gauges or histograms of the same name, one per combination of label values."""
+    def __init__(self, kind, name, documentation, labelnames, factory):
+        self.kind = kind
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.factory = factory
+        self.children = {}
+        self.lock = threading.Lock()
+
+    def labels(self, *values):
+        child = self.children.get(values)
+        if child is None:
+            assert len(values) == len(self.labelnames), f"{self.name} takes labels {self.labelnames}"
+            with self.lock:
+                child = self.children.setdefault(values, self.factory())
+        return child
+
+    def collect(self):
+        with self.lock:
+            children = list(self.children.items())
+        return [(dict(zip(self.labelnames, values)), child.get_value()) for values, child in children]
+
+class MetricsRegistry:
+    """
+    Holds the pipeline's metrics and renders them in the Prometheus text format or as JSON.
+
+    Recording a value costs a dictionary lookup and an uncontended lock, so metrics are always collected. Exporting
+    them is optional, see ``start_http_server`` and ``start_json_dump``.
+    """
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, kind, name, documentation, labelnames, factory):
+        metric = self.metrics.get(name)
+        if metric is None:
+            metric = self.metrics[name] = Metric(kind, name, documentation, tuple(labelnames), factory)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register("counter", name, documentation, labelnames, Counter)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register("gauge", name, documentation, labelnames, Gauge)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=STAGE_BUCKETS):
+        return self.register("histogram", name, documentation, labelnames, lambda: Histogram(buckets))
+
+    def to_dict(self):
+        return {name: metric.collect() for name, metric in self.metrics.items()}
+
+    def to_prometheus(self):
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for labels, value in metric.collect():
+                if metric.kind != "histogram":
+                    lines.append(f"{metric.name}{format_labels(labels)} {format_value(value['value'])}")
+                    continue
+                cumulative = 0
+                for bound, count in value["buckets"].items():
+                    cumulative += count
+                    lines.append(f"{metric.name}_bucket{format_labels(labels, le=bound)} {cumulative}")
+                lines.append(f"{metric.name}_sum{format_labels(labels)} {format_value(value['sum'])}")
+                lines.append(f"{metric.name}_count{format_labels(labels)} {value['count']}")
+        return "\n".join(lines) + "\n"
+
+    def start_http_server(self, port, host="127.0.0.1"):
+        """Serves the metrics in the Prometheus text format at ``http://host:port/metrics`` from a daemon thread."""
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.to_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server
+
+    def start_json_dump(self, path, interval=10):
+        """Rewrites ``path`` with the metrics as JSON every ``interval`` seconds from a daemon thread."""
+        def dump():
+            while True:
+                time.sleep(interval)
+                self.dump_json(path)
+
+        thread = threading.Thread(target=dump, name="metrics-dump", daemon=True)
+        thread.start()
+        return thread
+
+    def dump_json(self, path):
+        # readers never see a partly written file
+        temporary_path = path + ".tmp"
+        with open(temporary_path, "w") as f:
+            json.dump({"time": time.time(), "metrics": self.to_dict()}, f, indent=1)
+        os.replace(temporary_path, path)
+
+def estimate_quantile(buckets, counts, q):
+    """Interpolates the ``q`` quantile within the bucket it falls in, like Prometheus' ``histogram_quantile``."""
+    count = sum(counts)
+    if not count:
+        return None
+    rank, cumulative = q * count, 0
+    for i, bucket_count in enumerate(counts):
+        if cumulative + bucket_count >= rank and bucket_count:
+            if i == len(buckets):
+                return buckets[-1]
+            lower = buckets[i - 1] if i else 0.0
+            return lower + (buckets[i] - lower) * (rank - cumulative) / bucket_count
+        cumulative += bucket_count
+    return buckets[-1]
+
+def format_labels(labels, **extra):
+    labels = {**labels, **extra}
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for value in labels.values())
+    return "{" + ",".join(f"{name}=\"{value}\"" for name, value in zip(labels, escaped)) + "}"
+
+def format_value(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return "NaN"
+    return repr(float(value))
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "ecoute_stage_seconds",
+    "Time spent in each stage of the pipeline: record (recorder callback), queue_wait, prepare (audio conversion "
+    "before inference), inference and render (applying transcript changes to the UI).",
+    ("stage",))
+QUEUE_DEPTH = REGISTRY.gauge("ecoute_queue_depth", "Chunks of audio waiting to be transcribed.", ("queue",))
+AUDIO_SECONDS = REGISTRY.counter(
+    "ecoute_audio_seconds_total",
+    "Seconds of audio recorded, transcribed (counting re-transcribed audio), skipped as silence (gated) and cut from "
+    "the silent edges of phrases before inference (trimmed).",
+    ("stage",))
+INFERENCE_RTF = REGISTRY.histogram(
+    "ecoute_inference_real_time_factor", "Inference time per second of transcribed audio, for each model call.",
+    buckets=RTF_BUCKETS)
+DROPPED_CHUNKS = REGISTRY.counter(
+    "ecoute_dropped_chunks_total", "Chunks of audio discarded before their text reached the transcript.", ("reason",))
+COALESCED_CHUNKS = REGISTRY.counter(
+    "ecoute_coalesced_chunks_total", "Chunks of audio queued in the newest slot of a full queue.",
+    ("queue",))
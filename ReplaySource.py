@@ -0,0 +1,94 @@
+import threading
+import time
+import wave
+from datetime import datetime, timedelta
+import custom_speech_recognition as sr
+from custom_speech_recognition import dsp
+
+class WaveDeviceStream:
+    """Reads a WAV file through the ``read(frames, exception_on_overflow)`` interface of a PyAudio input stream."""
+    def __init__(self, reader):
+        self.reader = reader
+
+    def read(self, frames, exception_on_overflow=True):
+        return self.reader.readframes(frames)
+
+    def is_stopped(self):
+        return True
+
+    def close(self):
+        self.reader.close()
+
+class ReplayStream:
+    def __init__(self, source, stream):
+        self.source = source
+        self.stream = stream
+
+    def read(self, size):
+        data = self.stream.read(size)
+        if data:
+            self.source.frames_read += len(data) // self.source.SAMPLE_WIDTH
+            self.source.wait_until_recorded()
+        else:
+            self.source.finished.set()
+        return data
+
+class ReplaySource(sr.AudioSource):
+    """
+    Plays a WAV file into ``Recognizer.listen`` as if it came from a microphone, downmixed to mono and resampled to
+    ``sample_rate`` like the loopback device, in chunks of ``latency`` seconds.
+
+    With a ``speed``, reads block like a device would until the audio they return has been played, at ``speed`` times
+    real time (1 for real time, 4 to replay four times faster). Without one, the file is read as fast as it is
+    consumed, which makes runs deterministic. ``finished`` is set once the file has been read to the end, and
+    ``get_time`` returns the time within the recording, counted from ``start_time``, of the audio read so far.
+    """
+    def __init__(self, path, sample_rate=16000, latency=0.025, start_time=None, speed=None):
+        assert speed is None or speed > 0, "Speed must be None or a positive number"
+        self.path = path
+        with wave.open(path, "rb") as reader:
+            self.file_sample_rate = reader.getframerate()
+            self.file_channels = reader.getnchannels()
+            self.SAMPLE_WIDTH = reader.getsampwidth()
+        self.SAMPLE_RATE = sample_rate
+        self.channels = 1
+        self.CHUNK = max(1, int(sample_rate * latency))
+        self.start_time = start_time or datetime.utcnow()
+        self.frames_read = 0
+        self.finished = threading.Event()
+        self.speed = speed
+        self.started = None
+        self.stream = None
+
+    def __enter__(self):
+        assert self.stream is None, "This audio source is already inside a context manager"
+        reader = wave.open(self.path, "rb")
+        reader.setpos(min(round(self.frames_read * self.file_sample_rate / self.SAMPLE_RATE), reader.getnframes()))
+        device_stream = WaveDeviceStream(reader)
+        if self.file_sample_rate == self.SAMPLE_RATE and self.file_channels == 1:
+            stream = sr.Microphone.MicrophoneStream(device_stream)
+        else:
+            resampler = dsp.Resampler(self.file_sample_rate, self.SAMPLE_RATE, self.file_channels, self.SAMPLE_WIDTH)
+            file_chunk = max(1, round(self.CHUNK * self.file_sample_rate / self.SAMPLE_RATE))
+            stream = sr.Microphone.ResamplingMicrophoneStream(device_stream, resampler, self.CHUNK, file_chunk)
+        self.stream = ReplayStream(self, stream)
+        # playback continues where it stopped when the source is entered again
+        self.started = time.perf_counter() - self.get_played_duration()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stream.stream.close()
+        self.stream = None
+
+    def get_time(self):
+        return self.start_time + timedelta(seconds=self.frames_read / self.SAMPLE_RATE)
+
+    def get_played_duration(self):
+        """Returns the wall-clock time it takes to play the audio read so far at ``speed``."""
+        return self.frames_read / (self.SAMPLE_RATE * self.speed) if self.speed else 0.0
+
+    def wait_until_recorded(self):
+        if self.speed:
+            delay = self.started + self.get_played_duration() - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
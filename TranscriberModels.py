@@ -1,41 +1,269 @@
-import torch
-from faster_whisper import WhisperModel
-from openai import OpenAI
+import io
+import threading
+import wave
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 
-def get_model(use_api):
+# backend dependencies (faster_whisper, ctranslate2, openai) are imported by the backend that needs them,
+# so importing this module and picking a backend only pays for that backend
+WHISPER_SAMPLE_RATE = 16000
+BATCH_MAX_DURATION = 30
+NO_SPEECH_THRESHOLD = 0.6
+LOG_PROB_THRESHOLD = -1.0
+BEAM_SIZE = 5
+FAST_BEAM_SIZE = 1  # greedy decoding, used while transcription is falling behind
+
+API_MAX_IN_FLIGHT = 4
+API_MAX_RETRIES = 3
+API_TIMEOUT = 30
+# container and codec of uploads, encoded with PyAV, which faster-whisper already depends on
+UPLOAD_FORMATS = {"ogg": ("ogg", "libopus"), "flac": ("flac", "flac"), "wav": None}
+OPUS_BIT_RATE = 32000
+OPUS_COMPRESSION_LEVEL = 0  # the fastest, files come out barely larger than at the default of 10
+
+BACKENDS = {}
+
+def register_backend(name):
+    def register(factory):
+        BACKENDS[name] = factory
+        return factory
+    return register
+
+def get_backend(name, **kwargs):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown transcription backend {name!r}, expected one of: {', '.join(BACKENDS)}")
+    return BACKENDS[name](**kwargs)
+
+def get_model(use_api, num_workers=1):
     if use_api:
-        return APIWhisperTranscriber()
+        return get_backend("api")
     else:
-        return FasterWhisperTranscriber()
+        return get_backend("local", num_workers=num_workers)
+
+def cuda_available():
+    import ctranslate2
+    try:
+        return ctranslate2.get_cuda_device_count() > 0
+    except RuntimeError:
+        return False
 
+@register_backend("local")
 class FasterWhisperTranscriber:
-    def __init__(self):
+    def __init__(self, num_workers=1, model="tiny.en", cpu_threads=0):
+        from faster_whisper import WhisperModel
+
         print(f"[INFO] Loading Faster Whisper model...")
-        self.model = WhisperModel("tiny.en", device="cuda" if torch.cuda.is_available() else "cpu", 
-                                 compute_type="float32" if torch.cuda.is_available() else "int8")
-        print(f"[INFO] Faster Whisper using GPU: {torch.cuda.is_available()}")
+        use_gpu = cuda_available()
+        self.model = WhisperModel(model, device="cuda" if use_gpu else "cpu",
+                                 compute_type="float32" if use_gpu else "int8",
+                                 num_workers=num_workers, cpu_threads=cpu_threads)
+        self.beam_size = BEAM_SIZE
+        print(f"[INFO] Faster Whisper using GPU: {use_gpu}")
+
+    def set_fast_decode(self, enabled):
+        self.beam_size = FAST_BEAM_SIZE if enabled else BEAM_SIZE
+
+    def warm_up(self):
+        segments, _ = self.model.transcribe(np.zeros(WHISPER_SAMPLE_RATE, dtype=np.float32), beam_size=BEAM_SIZE)
+        list(segments)
 
-    def get_transcription(self, wav_file_path):
+    def get_transcription(self, audio):
         try:
-            segments, _ = self.model.transcribe(wav_file_path, beam_size=5)
+            segments, _ = self.model.transcribe(audio, beam_size=self.beam_size)
             full_text = " ".join(segment.text for segment in segments)
             return full_text.strip()
         except Exception as e:
             print(e)
             return ''
 
+    def get_segments(self, audio, initial_prompt=None):
+        try:
+            segments, _ = self.model.transcribe(audio, beam_size=self.beam_size, initial_prompt=initial_prompt)
+            return [(segment.start, segment.end, segment.text.strip()) for segment in segments]
+        except Exception as e:
+            print(e)
+            return []
+
+    def get_batch_transcriptions(self, audios):
+        return [" ".join(segment[2] for segment in segments).strip()
+                for segments in self.get_batch_segments(audios)]
+
+    def get_batch_segments(self, audios, initial_prompts=None):
+        initial_prompts = initial_prompts or [None] * len(audios)
+        # the batched path decodes a single 30 second window per input, longer audio needs the seeking decoder
+        if len(audios) == 1 or any(len(audio) > BATCH_MAX_DURATION * WHISPER_SAMPLE_RATE for audio in audios):
+            return [self.get_segments(audio, prompt) for audio, prompt in zip(audios, initial_prompts)]
+
+        import ctranslate2
+        from faster_whisper.tokenizer import Tokenizer
+
+        try:
+            model = self.model
+            nb_max_frames = model.feature_extractor.nb_max_frames
+            features = np.stack([model.feature_extractor(audio)[:, :nb_max_frames] for audio in audios])
+            encoder_output = model.model.encode(ctranslate2.StorageView.from_array(np.ascontiguousarray(features)))
+            if model.model.is_multilingual:
+                # like transcribe, each input is decoded in the language detected in it
+                languages = [result[0][0][2:-2] for result in model.model.detect_language(encoder_output)]
+            else:
+                languages = ["en"] * len(audios)
+            tokenizers = [Tokenizer(model.hf_tokenizer, model.model.is_multilingual, task="transcribe",
+                                    language=language) for language in languages]
+            prompts = [self.get_prompt(tokenizer, prompt) for tokenizer, prompt in zip(tokenizers, initial_prompts)]
+            results = model.model.generate(encoder_output, prompts, beam_size=self.beam_size,
+                                           max_length=model.max_length, return_scores=True,
+                                           return_no_speech_prob=True)
+
+            batch_segments = []
+            for audio, tokenizer, result in zip(audios, tokenizers, results):
+                tokens = result.sequences_ids[0]
+                avg_logprob = result.scores[0] * len(tokens) / (len(tokens) + 1)
+                if result.no_speech_prob > NO_SPEECH_THRESHOLD and avg_logprob < LOG_PROB_THRESHOLD:
+                    batch_segments.append([])
+                else:
+                    batch_segments.append(self.split_segments(tokenizer, tokens, len(audio) / WHISPER_SAMPLE_RATE))
+            return batch_segments
+        except Exception as e:
+            print(e)
+            return [[] for _ in audios]
+
+    def get_prompt(self, tokenizer, initial_prompt):
+        prompt = []
+        if initial_prompt:
+            prompt.append(tokenizer.sot_prev)
+            prompt.extend(tokenizer.encode(" " + initial_prompt.strip())[-(self.model.max_length // 2 - 1):])
+        prompt.extend(tokenizer.sot_sequence)
+        return prompt
+
+    def split_segments(self, tokenizer, tokens, duration):
+        segments = []
+        start, text_tokens = 0.0, []
+        for token in tokens:
+            if token >= tokenizer.timestamp_begin:
+                time = (token - tokenizer.timestamp_begin) * self.model.time_precision
+                if text_tokens:
+                    segments.append((start, time, tokenizer.decode(text_tokens).strip()))
+                    text_tokens = []
+                start = time
+            elif token < tokenizer.eot:
+                text_tokens.append(token)
+        if text_tokens:
+            segments.append((start, duration, tokenizer.decode(text_tokens).strip()))
+        return segments
+
+@register_backend("api")
 class APIWhisperTranscriber:
-    def __init__(self, api_key=None):
-        self.client = OpenAI(api_key=api_key)
-    
-    def get_transcription(self, wav_file_path):
+    """
+    Transcribes with the OpenAI API, uploading mono 16 kHz audio compressed in ``upload_format``.
+
+    One client is kept for the whole session, so its HTTP connections stay alive and are shared by every thread that
+    transcribes. At most ``max_in_flight`` requests are sent at once, and the client retries failed connections,
+    rate limits and server errors ``max_retries`` times with exponential backoff. The batch methods send their requests
+    concurrently.
+
+    ``get_segments`` makes ``--streaming`` work with the API: only the audio that is not committed yet is uploaded,
+    with the committed text as the prompt. It needs a model that returns timestamps, like ``whisper-1``.
+    """
+    def __init__(self, api_key=None, model="whisper-1", base_url=None, upload_format="ogg",
+                 max_in_flight=API_MAX_IN_FLIGHT, max_retries=API_MAX_RETRIES, timeout=API_TIMEOUT):
+        from openai import OpenAI
+
+        if upload_format not in UPLOAD_FORMATS:
+            raise ValueError(f"Unknown upload format {upload_format!r}, expected one of: {', '.join(UPLOAD_FORMATS)}")
+        self.client = OpenAI(api_key=api_key, base_url=base_url, max_retries=max_retries, timeout=timeout)
+        self.model = model
+        self.upload_format = upload_format
+        self.in_flight = threading.BoundedSemaphore(max_in_flight)
+        self.executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="api-upload")
+        self.stats_lock = threading.Lock()
+        self.requests = 0
+        self.uploaded_bytes = 0
+
+    def warm_up(self):
         try:
-            with open(wav_file_path, "rb") as audio_file:
-                result = self.client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio_file
-                )
-            return result.text.strip()
+            encode_audio(np.zeros(WHISPER_SAMPLE_RATE, dtype=np.float32), self.upload_format)
+        except Exception as e:
+            print(f"[WARNING] Can't encode {self.upload_format} uploads, sending WAV instead: {e}")
+            self.upload_format = "wav"
+
+    def get_transcription(self, audio):
+        try:
+            return self.transcribe(audio).text.strip()
         except Exception as e:
             print(e)
-            return ''
\ No newline at end of file
+            return ''
+
+    def get_segments(self, audio, initial_prompt=None):
+        try:
+            result = self.transcribe(audio, initial_prompt, response_format="verbose_json",
+                                     timestamp_granularities=["segment"])
+            return [(segment.start, segment.end, segment.text.strip()) for segment in result.segments or []]
+        except Exception as e:
+            print(e)
+            return []
+
+    def get_batch_transcriptions(self, audios):
+        return list(self.executor.map(self.get_transcription, audios))
+
+    def get_batch_segments(self, audios, initial_prompts=None):
+        return list(self.executor.map(self.get_segments, audios, initial_prompts or [None] * len(audios)))
+
+    def transcribe(self, audio, prompt=None, **kwargs):
+        if isinstance(audio, np.ndarray):
+            audio_file = encode_audio(audio, self.upload_format)
+        else:
+            audio_file = open(audio, "rb")
+        if prompt:
+            # the API continues from the prompt, like the local model does from ``initial_prompt``
+            kwargs["prompt"] = prompt
+        with audio_file, self.in_flight:
+            size = audio_file.seek(0, io.SEEK_END)
+            audio_file.seek(0)
+            result = self.client.audio.transcriptions.create(
+                model=self.model,
+                file=audio_file,
+                **kwargs
+            )
+        with self.stats_lock:
+            self.requests += 1
+            self.uploaded_bytes += size
+        return result
+
+    def get_stats(self):
+        with self.stats_lock:
+            return {"requests": self.requests, "uploaded_bytes": self.uploaded_bytes}
+
+def encode_audio(audio, upload_format="ogg", sample_rate=WHISPER_SAMPLE_RATE):
+    """Encodes mono float32 audio into an in-memory file named for its format, ready to upload."""
+    if UPLOAD_FORMATS[upload_format] is None:
+        return float32_to_wav(audio, sample_rate)
+    import av
+
+    container_format, codec = UPLOAD_FORMATS[upload_format]
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+    audio_file = io.BytesIO()
+    container = av.open(audio_file, "w", format=container_format)
+    stream = container.add_stream(codec, rate=sample_rate, layout="mono")
+    if codec == "libopus":
+        stream.bit_rate = OPUS_BIT_RATE
+        stream.options = {"compression_level": str(OPUS_COMPRESSION_LEVEL)}
+    frame = av.AudioFrame.from_ndarray(pcm.reshape(1, -1), format="s16", layout="mono")
+    frame.sample_rate = sample_rate
+    container.mux(stream.encode(frame))
+    container.mux(stream.encode(None))
+    container.close()
+    audio_file.seek(0)
+    audio_file.name = f"audio.{upload_format}"
+    return audio_file
+
+def float32_to_wav(audio, sample_rate=WHISPER_SAMPLE_RATE):
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+    wav_file = io.BytesIO()
+    with wave.open(wav_file, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(pcm.tobytes())
+    wav_file.seek(0)
+    wav_file.name = "audio.wav"
+    return wav_file
\ No newline at end of file
@@ -0,0 +1,98 @@
+import re
+import threading
+from bisect import bisect_left
+
+TOKEN_PATTERN = re.compile(r"\w+(?:'\w+)*")
+QUERY_PATTERN = re.compile(r'"([^"]*)"|(\S+)')
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+class TranscriptIndex:
+    """
+    Inverted index over transcript segments, kept up to date as segments are committed.
+
+    Every token maps to the segments containing it and the token positions within each segment, which is enough to
+    answer phrase queries without looking at the text again. A sorted list of the distinct tokens answers prefix
+    queries with a binary search. A segment that is replaced (same ``id``, new text) is re-indexed.
+
+    Queries are whitespace-separated terms that must all match: ``word`` matches that word, ``wor*`` any word starting
+    with ``wor`` and ``"some words"`` the words in that order.
+    """
+    def __init__(self):
+        self.postings = {}  # token -> {segment id: token positions}
+        self.tokens = []  # sorted distinct tokens
+        self.segments = {}  # segment id -> latest TranscriptSegment
+        self.segment_tokens = {}  # segment id -> tokens of the indexed text
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.segments)
+
+    def update(self, segment):
+        tokens = tokenize(segment.text)
+        with self.lock:
+            self.remove(segment.id)
+            self.segments[segment.id] = segment
+            self.segment_tokens[segment.id] = tokens
+            for position, token in enumerate(tokens):
+                segment_postings = self.postings.get(token)
+                if segment_postings is None:
+                    segment_postings = self.postings[token] = {}
+                    self.tokens.insert(bisect_left(self.tokens, token), token)
+                segment_postings.setdefault(segment.id, []).append(position)
+
+    def remove(self, segment_id):
+        for token in set(self.segment_tokens.pop(segment_id, ())):
+            segment_postings = self.postings[token]
+            del segment_postings[segment_id]
+            if not segment_postings:
+                del self.postings[token]
+                del self.tokens[bisect_left(self.tokens, token)]
+        self.segments.pop(segment_id, None)
+
+    def search(self, query, limit=50):
+        """Returns up to ``limit`` segments matching ``query``, most recent first."""
+        terms = QUERY_PATTERN.findall(query)
+        if not terms:
+            return []
+        with self.lock:
+            matches = None
+            for phrase, term in terms:
+                if phrase:
+                    term_matches = self.match_phrase(tokenize(phrase))
+                elif term.endswith("*"):
+                    term_matches = self.match_prefix(term[:-1].lower())
+                else:
+                    # a term like "e-mail" tokenizes into several words, which have to appear together
+                    term_matches = self.match_phrase(tokenize(term))
+                matches = term_matches if matches is None else matches & term_matches
+                if not matches:
+                    return []
+            results = [self.segments[segment_id] for segment_id in matches]
+        results.sort(key=lambda segment: segment.time_spoken, reverse=True)
+        return results[:limit]
+
+    def match_prefix(self, prefix):
+        matches = set()
+        for i in range(bisect_left(self.tokens, prefix), len(self.tokens)):
+            if not self.tokens[i].startswith(prefix):
+                break
+            matches.update(self.postings[self.tokens[i]])
+        return matches
+
+    def match_phrase(self, tokens):
+        if not tokens:
+            return set()
+        postings = [self.postings.get(token) for token in tokens]
+        if not all(postings):
+            return set()
+        # check the rarest token's segments first
+        candidates = set(min(postings, key=len)).intersection(*postings)
+        matches = set()
+        for segment_id in candidates:
+            following = [set(token_postings[segment_id]) for token_postings in postings[1:]]
+            if any(all(start + offset in positions for offset, positions in enumerate(following, 1))
+                   for start in postings[0][segment_id]):
+                matches.add(segment_id)
+        return matches
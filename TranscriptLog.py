@@ -0,0 +1,147 @@
+import json
+import mmap
+import os
+import queue
+import struct
+import threading
+import uuid
+from datetime import datetime
+from TranscriptStore import TranscriptSegment
+
+INDEX_RECORD = struct.Struct("<QI")  # byte offset and length of one line of the log
+READ_BATCH = 256
+SESSION_DIRECTORY = "transcripts"
+
+class TranscriptLog:
+    """
+    Append-only on-disk log of finished transcript segments.
+
+    Segments are stored one JSON object per line in ``path``, and ``path + ".idx"`` holds a fixed-size
+    ``INDEX_RECORD`` per segment, so any segment can be read from the memory-mapped files without scanning them.
+    Appends are encoded and written by a background thread. A segment becomes readable once its line and its index
+    record are both on disk, and the index is always written after the data it points to.
+
+    Opening an existing log appends a new session to it. Every line records the ``session`` it belongs to, the time
+    the log was opened followed by a random suffix, since sessions can be opened within the same second. Segments of
+    earlier sessions come before ``session_start``.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.session = f"{datetime.now().isoformat(timespec='seconds')}-{uuid.uuid4().hex[:8]}"
+        self.index_path = path + ".idx"
+        self.data_file = open(path, "ab")
+        self.index_file = open(self.index_path, "ab")
+        # drop a partial index record left behind by an interrupted write
+        self.index_file.truncate(self.index_file.tell() - self.index_file.tell() % INDEX_RECORD.size)
+        self.index_file.seek(0, os.SEEK_END)
+        self.session_start = len(self)
+
+        self.maps = {}
+        self.map_lock = threading.Lock()
+        self.pending = queue.Queue()
+        self.writer = threading.Thread(target=self.write_segments, name="transcript-log", daemon=True)
+        self.writer.start()
+
+    def append(self, segment):
+        self.pending.put(segment)
+
+    def flush(self):
+        """Blocks until every appended segment is readable."""
+        self.pending.join()
+
+    def close(self):
+        self.pending.put(None)
+        self.writer.join()
+        with self.map_lock:
+            for file, data_map in self.maps.values():
+                data_map.close()
+                file.close()
+            self.maps.clear()
+        self.data_file.close()
+        self.index_file.close()
+
+    def write_segments(self):
+        closing = False
+        while not closing:
+            segments = [self.pending.get()]
+            while True:
+                try:
+                    segments.append(self.pending.get_nowait())
+                except queue.Empty:
+                    break
+
+            data, index = bytearray(), bytearray()
+            offset = self.data_file.tell()
+            for segment in segments:
+                if segment is None:
+                    closing = True
+                    continue
+                line = encode_segment(segment, self.session)
+                index += INDEX_RECORD.pack(offset + len(data), len(line))
+                data += line
+            if data:
+                self.data_file.write(data)
+                self.data_file.flush()
+                self.index_file.write(index)
+                self.index_file.flush()
+            for _ in segments:
+                self.pending.task_done()
+
+    def __len__(self):
+        return os.path.getsize(self.index_path) // INDEX_RECORD.size
+
+    def read(self, start=0, stop=None):
+        """Returns the segments ``start`` to ``stop`` in the order they were appended."""
+        start, stop, _ = slice(start, stop).indices(len(self))
+        if start >= stop:
+            return []
+        with self.map_lock:
+            index = self.get_map(self.index_path, stop * INDEX_RECORD.size)
+            entries = [INDEX_RECORD.unpack_from(index, i * INDEX_RECORD.size) for i in range(start, stop)]
+            last_offset, last_length = entries[-1]
+            data = self.get_map(self.path, last_offset + last_length)
+            return [decode_segment(data[offset:offset + length]) for offset, length in entries]
+
+    def __iter__(self):
+        return self.iter_segments()
+
+    def iter_segments(self, start=0, stop=None):
+        """Yields the segments ``start`` to ``stop`` in the order they were appended, reading ``READ_BATCH`` at a time."""
+        stop = len(self) if stop is None else stop
+        while start < stop:
+            segments = self.read(start, min(start + READ_BATCH, stop))
+            if not segments:
+                return
+            yield from segments
+            start += len(segments)
+
+    def iter_session(self, stop=None):
+        """Yields the segments of this session up to ``stop``, counted from the start of the log."""
+        return self.iter_segments(self.session_start, stop)
+
+    def get_map(self, path, size):
+        # the files only grow, so a map is only replaced when it does not reach far enough yet
+        file, data_map = self.maps.get(path, (None, None))
+        if data_map is None or len(data_map) < size:
+            if data_map is not None:
+                data_map.close()
+                file.close()
+            file = open(path, "rb")
+            data_map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.maps[path] = (file, data_map)
+        return data_map
+
+def get_session_path(directory=SESSION_DIRECTORY):
+    """Returns a new log path in ``directory`` named after the current time, creating the directory if needed."""
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, datetime.now().strftime("%Y-%m-%d_%H-%M-%S") + ".jsonl")
+
+def encode_segment(segment, session=None):
+    record = {"id": segment.id, "who_spoke": segment.who_spoke, "text": segment.text,
+              "time_spoken": segment.time_spoken.isoformat(), "session": session}
+    return json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n"
+
+def decode_segment(line):
+    record = json.loads(line)
+    return TranscriptSegment(record["id"], record["who_spoke"], record["text"],
+                             datetime.fromisoformat(record["time_spoken"]))
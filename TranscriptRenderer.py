@@ -0,0 +1,52 @@
+import queue
+import Metrics
+
+RENDER_INTERVAL = 50  # milliseconds between checks for transcript changes
+
+def write_in_textbox(textbox, text):
+    textbox.delete("0.0", "end")
+    textbox.insert("0.0", text)
+
+class TranscriptRenderer:
+    """
+    Applies transcript changes to the textbox as they happen, touching only the segments that were inserted, replaced or
+    removed.
+
+    The transcription thread only pushes every change onto a queue, it never calls into Tk. The Tk thread drains the
+    queue every ``RENDER_INTERVAL`` milliseconds, so a burst of changes is applied in a single callback.
+    """
+    def __init__(self, root, textbox, transcript):
+        self.root = root
+        self.textbox = textbox
+        self.updates = queue.SimpleQueue()
+        self.version = 0
+        self.render_seconds = Metrics.STAGE_SECONDS.labels("render")
+        transcript.subscribe(self.push)
+        self.push(None, transcript.snapshot, ())  # renders whatever was transcribed before the UI existed
+        self.render()
+
+    def push(self, base_version, snapshot, changes):
+        self.updates.put((base_version, snapshot, changes))
+
+    def render(self):
+        if not self.updates.empty():
+            with self.render_seconds.time():
+                self.apply_updates()
+        self.root.after(RENDER_INTERVAL, self.render)
+
+    def apply_updates(self):
+        while True:
+            try:
+                base_version, snapshot, changes = self.updates.get_nowait()
+            except queue.Empty:
+                break
+            if base_version == self.version:
+                for start, end, lines in changes:
+                    # every segment takes two lines of the textbox, the text and a blank line
+                    self.textbox.delete(f"{2 * start + 1}.0", f"{2 * end + 1}.0")
+                    self.textbox.insert(f"{2 * start + 1}.0", "".join(lines))
+            elif snapshot.version > self.version:
+                write_in_textbox(self.textbox, "".join(segment.line for segment in snapshot.segments))
+            else:
+                continue
+            self.version = snapshot.version
@@ -0,0 +1,182 @@
+import difflib
+import itertools
+import threading
+from collections import deque
+from heapq import merge
+
+class TranscriptSegment:
+    __slots__ = ("id", "who_spoke", "text", "time_spoken", "line")
+
+    def __init__(self, id, who_spoke, text, time_spoken):
+        self.id = id
+        self.who_spoke = who_spoke
+        self.text = text
+        self.time_spoken = time_spoken
+        # exactly two lines, the UI relies on it to find segments in the textbox
+        self.line = f"{who_spoke}: [{' '.join(text.splitlines())}]\n\n"
+
+class TranscriptSnapshot:
+    __slots__ = ("version", "segments")
+
+    def __init__(self, version, segments):
+        self.version = version
+        self.segments = segments  # tuple of TranscriptSegment, newest first
+
+class TranscriptStore:
+    """
+    Keeps the latest ``max_segments`` transcript segments of every source and publishes them as immutable snapshots.
+
+    Writers are serialized by a lock. Readers never take it: they read ``snapshot``, which is replaced rather than
+    mutated on every change and carries a version number that increases with each change. Listeners are called after
+    the lock is released, so they may block or read the store. Segments are never mutated
+    either, so a replaced segment is a new record that keeps the ``id`` of the one it replaces.
+
+    With a ``log`` (a ``TranscriptLog``), every segment is appended to it once it is finished, that is once its source
+    starts a new segment, ``finish_last`` is called for it or the transcript is cleared, so the whole session stays available while memory stays bounded.
+    Only the log's current session is part of the history, earlier sessions in the same file are not.
+    """
+    def __init__(self, sources, max_segments, log=None):
+        self.max_segments = max_segments
+        self.log = log
+        self.sources = {who_spoke: deque(maxlen=max_segments) for who_spoke in sources}  # oldest first
+        self.ids = itertools.count()
+        self.lock = threading.Lock()
+        self.snapshot = TranscriptSnapshot(0, ())
+        self.cached_text = (0, "")
+        self.listeners = []
+        self.finished_listeners = []
+        self.finished_sources = set()  # sources whose newest segment was finished by finish_last
+
+    def subscribe(self, listener):
+        """Calls ``listener(base_version, snapshot, changes)`` on the writing thread after every change, with ``changes`` as returned by ``diff_segments``."""
+        self.listeners.append(listener)
+
+    def subscribe_finished(self, listener):
+        """Calls ``listener(segment)`` on the writing thread with every segment once it is finished, in the order they finish."""
+        self.finished_listeners.append(listener)
+
+    def add(self, who_spoke, text, time_spoken):
+        with self.lock:
+            segments = self.sources[who_spoke]
+            finished = self.finish([segments[-1]] if segments and who_spoke not in self.finished_sources else [])
+            self.finished_sources.discard(who_spoke)
+            segments.append(TranscriptSegment(next(self.ids), who_spoke, text, time_spoken))
+            segment = segments[-1]
+            update = self.publish()
+        self.notify(finished, update)
+        return segment
+
+    def replace_last(self, who_spoke, text, time_spoken):
+        with self.lock:
+            segments = self.sources[who_spoke]
+            if segments:
+                segments[-1] = TranscriptSegment(segments[-1].id, who_spoke, text, time_spoken)
+            else:
+                segments.append(TranscriptSegment(next(self.ids), who_spoke, text, time_spoken))
+            segment = segments[-1]
+            update = self.publish()
+        self.notify((), update)
+        return segment
+
+    def finish_last(self, who_spoke):
+        """
+        Finishes the newest segment of ``who_spoke`` without waiting for its next one, e.g. once the source has been
+        silent for a while. The segment stays in the transcript, but must not be replaced any more.
+        """
+        with self.lock:
+            segments = self.sources[who_spoke]
+            if not segments or who_spoke in self.finished_sources:
+                return
+            finished = self.finish([segments[-1]])
+            self.finished_sources.add(who_spoke)
+        self.notify(finished, None)
+
+    def is_empty(self, who_spoke):
+        return len(self.sources[who_spoke]) == 0
+
+    def clear(self):
+        with self.lock:
+            finished = self.finish_segments()
+            update = self.publish()
+        self.notify(finished, update)
+
+    def close(self):
+        with self.lock:
+            finished = self.finish_segments()
+        self.notify(finished, None)
+        if self.log is not None:
+            self.log.close()
+
+    def finish_segments(self):
+        finished = self.finish([segments[-1] for who_spoke, segments in self.sources.items()
+                                if segments and who_spoke not in self.finished_sources])
+        for segments in self.sources.values():
+            segments.clear()
+        self.finished_sources.clear()
+        return finished
+
+    def finish(self, segments):
+        # logged under the lock, see iter_history
+        if self.log is not None:
+            for segment in segments:
+                self.log.append(segment)
+        return segments
+
+    def iter_history(self):
+        """Yields every segment of the session oldest first, from the log when there is one, otherwise from memory."""
+        with self.lock:
+            if self.log is None:
+                return iter(tuple(reversed(self.snapshot.segments)))
+            # segments are only logged under the lock, so after this flush the log and the current segments don't overlap
+            self.log.flush()
+            logged = len(self.log)
+            current = {who_spoke: segments[-1] for who_spoke, segments in self.sources.items()
+                       if segments and who_spoke not in self.finished_sources}
+        # the log is in the order segments finished, which is chronological per source but not across sources
+        per_source = [itertools.chain(self.iter_logged(who_spoke, logged),
+                                      [current[who_spoke]] if who_spoke in current else [])
+                      for who_spoke in self.sources]
+        return merge(*per_source, key=lambda segment: segment.time_spoken)
+
+    def iter_logged(self, who_spoke, stop):
+        for segment in self.log.iter_session(stop=stop):
+            if segment.who_spoke == who_spoke:
+                yield segment
+
+    def publish(self):
+        """Replaces the snapshot, returns what ``notify`` passes to the listeners."""
+        previous = self.snapshot
+        newest_first = merge(*(reversed(segments) for segments in self.sources.values()),
+                             key=lambda segment: segment.time_spoken, reverse=True)
+        self.snapshot = TranscriptSnapshot(previous.version + 1,
+                                           tuple(itertools.islice(newest_first, self.max_segments)))
+        changes = diff_segments(previous.segments, self.snapshot.segments) if self.listeners else ()
+        return previous.version, self.snapshot, changes
+
+    def notify(self, finished, update):
+        for segment in finished:
+            for listener in self.finished_listeners:
+                listener(segment)
+        if update is not None:
+            for listener in self.listeners:
+                listener(*update)
+
+    def get_text(self):
+        version, text = self.cached_text
+        snapshot = self.snapshot
+        if snapshot.version != version:
+            # every segment formats its line once when it is created, so this is just a join
+            text = "".join(segment.line for segment in snapshot.segments)
+            self.cached_text = (snapshot.version, text)
+        return text
+
+def diff_segments(old, new):
+    """
+    Returns the edits that turn the segment sequence ``old`` into ``new`` as ``(start, end, lines)`` tuples: replace
+    ``old[start:end]`` with ``lines``. Edits are in descending order of ``start``, so they can be applied one after the
+    other without shifting each other's positions.
+    """
+    matcher = difflib.SequenceMatcher(None, [(segment.id, segment.text) for segment in old],
+                                      [(segment.id, segment.text) for segment in new], autojunk=False)
+    return [(i1, i2, tuple(segment.line for segment in new[j1:j2]))
+            for tag, i1, i2, j1, j2 in reversed(matcher.get_opcodes()) if tag != "equal"]
@@ -0,0 +1,49 @@
+import threading
+import time
+from AudioChannel import AudioChannel, MAX_QUEUED_CHUNKS
+
+class TranscriptionScheduler:
+    """
+    Wakes the transcription thread as soon as audio arrives on any of its queues, and lets it sleep while idle.
+
+    Audio channels must be created with ``create_channel`` so that every ``put`` notifies the scheduler.
+    """
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.pending = False
+        self.notified_at = None
+        self.notifications = 0
+        self.wakeups = 0
+        self.total_wake_latency = 0.0
+        self.max_wake_latency = 0.0
+
+    def create_channel(self, source, maxsize=MAX_QUEUED_CHUNKS, policy="coalesce", name=None):
+        return AudioChannel(self, source, maxsize, policy, name)
+
+    def notify(self):
+        with self.condition:
+            self.notifications += 1
+            if not self.pending:
+                self.pending = True
+                self.notified_at = time.perf_counter()
+            self.condition.notify_all()
+
+    def wait(self, timeout=None):
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.pending, timeout):
+                return False
+            self.pending = False
+            latency = time.perf_counter() - self.notified_at
+            self.wakeups += 1
+            self.total_wake_latency += latency
+            self.max_wake_latency = max(self.max_wake_latency, latency)
+            return True
+
+    def get_stats(self):
+        with self.condition:
+            return {
+                "notifications": self.notifications,
+                "wakeups": self.wakeups,
+                "mean_wake_latency": self.total_wake_latency / self.wakeups if self.wakeups else 0.0,
+                "max_wake_latency": self.max_wake_latency,
+            }
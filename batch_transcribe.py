@@ -0,0 +1,175 @@
+"""
+Transcribes recordings faster than real time with the local model, for meetings that were recorded rather than live.
+
+    python batch_transcribe.py --workers 4 --output meetings.jsonl recordings/*.wav
+
+Each file is split into chunks of at most ``--max-chunk`` seconds, cutting at the quietest point so that words are not
+split between chunks. The chunks are transcribed by a pool of processes that each load their own model with a share
+of the CPU threads. Segments are written in order as one JSON object per line, and the overall real-time factor is
+reported at the end.
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ProcessPoolExecutor, wait
+import numpy as np
+import custom_speech_recognition as sr
+from custom_speech_recognition import dsp
+
+SAMPLE_RATE = 16000
+FRAME_DURATION = 0.02
+MIN_CHUNK_DURATION = 10
+MAX_CHUNK_DURATION = 30
+SILENCE_THRESHOLD = 100  # RMS of 16-bit samples below which a chunk is not worth transcribing
+
+worker_model = None
+
+def init_worker(model, cpu_threads):
+    global worker_model
+    import TranscriberModels
+    worker_model = TranscriberModels.FasterWhisperTranscriber(model=model, cpu_threads=cpu_threads)
+
+def transcribe_chunk(audio):
+    return worker_model.get_segments(audio.astype(np.float32) / 32768.0)
+
+def read_audio(path, window_duration=MAX_CHUNK_DURATION):
+    """
+    Yields the audio in ``path`` (WAV, AIFF or FLAC) as 16 kHz mono 16-bit PCM bytes, ``window_duration`` seconds of
+    the file at a time, so that long recordings are never held in memory whole.
+    """
+    with sr.AudioFile(path) as source:
+        resampler = dsp.Resampler(source.SAMPLE_RATE, SAMPLE_RATE)
+        frames = max(1, int(window_duration * source.SAMPLE_RATE))
+        while True:
+            buffer = source.stream.read(frames)
+            if not buffer:
+                break
+            raw_data = sr.AudioData(buffer, source.SAMPLE_RATE, source.SAMPLE_WIDTH).get_raw_data(convert_width=2)
+            yield resampler.process(raw_data)
+
+def split_at_silence(windows, min_duration=MIN_CHUNK_DURATION, max_duration=MAX_CHUNK_DURATION):
+    """
+    Yields ``(start, samples)`` chunks of at most ``max_duration`` seconds of the 16 kHz mono PCM ``windows``, cut at
+    the quietest frame after ``min_duration``. Only the audio not yet yielded, at most ``max_duration`` seconds plus a
+    window, is kept.
+    """
+    frame_size = int(SAMPLE_RATE * FRAME_DURATION)
+    min_frames, max_frames = int(min_duration / FRAME_DURATION), int(max_duration / FRAME_DURATION)
+
+    pending, pending_start = b"", 0  # audio not yet yielded, and its first frame
+    for window in itertools.chain(windows, [None]):
+        if window is not None:
+            pending += window
+            if len(pending) // (2 * frame_size) <= max_frames:
+                continue
+        energies = dsp.rms_frames(pending, 2, frame_size)
+        samples = dsp.to_array(pending, 2)
+
+        start = 0
+        while start < len(energies):
+            if len(energies) - start <= max_frames:
+                if window is not None:
+                    break  # the next window may still hold a quieter cut
+                end = len(energies) + 1  # the last chunk also takes the trailing partial frame
+            else:
+                candidates = energies[start + min_frames:start + max_frames]
+                # the last of the quietest frames, so that chunks stay long
+                end = start + min_frames + len(candidates) - 1 - int(np.argmin(candidates[::-1]))
+            if energies[start:end].max(initial=0) >= SILENCE_THRESHOLD:
+                yield (pending_start + start) * FRAME_DURATION, samples[start * frame_size:end * frame_size]
+            start = end
+        pending = pending[start * frame_size * 2:]
+        pending_start += start
+
+def write_segments(output, path, start, segments):
+    for segment_start, segment_end, text in segments:
+        if text:
+            record = {"file": path, "start": round(start + segment_start, 2), "end": round(start + segment_end, 2),
+                      "text": text}
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+    output.flush()
+
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+def parse_args(argv=None):
+    cpu_count = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Transcribe recordings with a pool of local models.")
+    parser.add_argument("files", nargs="+", help="WAV, AIFF or FLAC files")
+    parser.add_argument("--model", default="tiny.en", help="model name (default: %(default)s)")
+    parser.add_argument("--workers", type=positive_int, default=max(1, cpu_count // 4),
+                        help="worker processes, one model each (default: %(default)s)")
+    parser.add_argument("--cpu-threads", type=int, default=0,
+                        help="CPU threads per worker (default: the CPU count divided among the workers)")
+    parser.add_argument("--max-chunk", type=float, default=MAX_CHUNK_DURATION,
+                        help="longest chunk in seconds (default: %(default)s)")
+    parser.add_argument("--output", help="JSONL file to write segments to (default: stdout)")
+    args = parser.parse_args(argv)
+    args.cpu_threads = args.cpu_threads or max(1, cpu_count // args.workers)
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    start_time = time.perf_counter()
+    audio_duration = 0.0
+    max_pending = 2 * args.workers  # keeps only a few chunks of audio in memory ahead of the workers
+
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker,
+                             initargs=(args.model, args.cpu_threads)) as executor:
+        pending = set()
+        # chunks finish out of order, they are written once all the chunks before them are written
+        queued, finished, next_chunk = [], {}, 0
+
+        def collect(return_when):
+            nonlocal next_chunk
+            done, _ = wait(pending, return_when=return_when)
+            for future in done:
+                pending.remove(future)
+                finished[future.chunk_number] = future.result()
+            while next_chunk in finished:
+                path, start = queued[next_chunk]
+                write_segments(output, path, start, finished.pop(next_chunk))
+                queued[next_chunk] = None
+                next_chunk += 1
+
+        def measure(windows):
+            nonlocal audio_duration
+            for window in windows:
+                audio_duration += len(window) / (2 * SAMPLE_RATE)
+                yield window
+
+        for path in args.files:
+            file_start = audio_duration
+            windows = measure(read_audio(path, args.max_chunk))
+            try:
+                for start, samples in split_at_silence(windows, min(MIN_CHUNK_DURATION, args.max_chunk / 2),
+                                                       args.max_chunk):
+                    if len(pending) >= max_pending:
+                        collect(FIRST_COMPLETED)
+                    future = executor.submit(transcribe_chunk, samples)
+                    future.chunk_number = len(queued)
+                    queued.append((path, start))
+                    pending.add(future)
+            except (ValueError, OSError) as e:
+                print(f"[ERROR] Skipping {path}: {e}", file=sys.stderr)
+                continue
+            print(f"[INFO] {path}: {audio_duration - file_start:.1f} s", file=sys.stderr)
+        if pending:
+            collect(ALL_COMPLETED)
+
+    elapsed = time.perf_counter() - start_time
+    if output is not sys.stdout:
+        output.close()
+    if audio_duration:
+        print(f"[INFO] Transcribed {audio_duration:.1f} s of audio in {elapsed:.1f} s, real-time factor "
+              f"{elapsed / audio_duration:.3f} ({audio_duration / elapsed:.1f}x real time)", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
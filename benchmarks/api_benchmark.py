@@ -0,0 +1,293 @@
+"""
+Benchmarks the API backend offline against a local stand-in for the transcription endpoint.
+
+The stand-in answers every upload after ``--latency`` seconds plus the time its body takes at ``--bandwidth``, fails
+``--error-rate`` of the requests with a 503, and counts requests, connections and bytes. Its transcript is one word
+per second of uploaded audio, with segment timestamps when asked for ``verbose_json``.
+
+Uploads: each upload format is run sequentially, one request at a time like the transcription thread without
+workers, and in concurrent pairs like the microphone and speaker with ``--batched``.
+
+Pipeline: ``--pipeline`` instead replays speech-like audio through the recorder and AudioTranscriber, with and without
+``--streaming``, and reports the bytes uploaded per minute of speech. Without streaming, every update re-uploads the
+whole phrase; with it, only the audio that is not committed yet.
+
+Usage: python benchmarks/api_benchmark.py [--requests 20] [--seconds 5] [--audio phrase.wav] [--latency 0.15]
+                                          [--bandwidth 250000] [--error-rate 0.05]
+       python benchmarks/api_benchmark.py --pipeline [--seconds 120] [--speed 4] [--audio speech.wav]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import wave
+from datetime import datetime
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import AudioRecorder
+import TranscriberModels
+from AudioTranscriber import AudioTranscriber
+from TranscriptionScheduler import TranscriptionScheduler
+from custom_speech_recognition import dsp
+from e2e_benchmark import FRAME_DURATION, SPEECH_THRESHOLD, synthetic_speech
+
+SAMPLE_RATE = TranscriberModels.WHISPER_SAMPLE_RATE
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Serves ``/v1/audio/transcriptions`` like the API would, slowly and unreliably on purpose."""
+    daemon_threads = True
+
+    def __init__(self, latency=0.15, bandwidth=250000, error_rate=0.0, seed=0):
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests = 0
+            self.errors = 0
+            self.connections = 0
+            self.uploaded_bytes = 0
+
+    def get_stats(self):
+        with self.lock:
+            return {"requests": self.requests, "errors": self.errors, "connections": self.connections,
+                    "uploaded_bytes": self.uploaded_bytes}
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name="stand-in-api", daemon=True).start()
+        return self
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keeps connections alive between requests
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.uploaded_bytes += len(body)
+            failed = self.server.random.random() < self.server.error_rate
+            if failed:
+                self.server.errors += 1
+        time.sleep(self.server.latency + len(body) / self.server.bandwidth)
+
+        if not self.path.endswith("/audio/transcriptions"):
+            self.send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+        elif failed:
+            self.send_json(503, {"error": {"message": "overloaded"}})
+        else:
+            self.send_json(200, transcribe(parse_form(self.headers["Content-Type"], body)))
+
+    def send_json(self, status, payload):
+        response = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(response)))
+        if status == 503:
+            self.send_header("Retry-After", "0")
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def parse_form(content_type, body):
+    message = BytesParser(policy=HTTP).parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+    return {part.get_param("name", header="content-disposition"): part.get_payload(decode=True)
+            for part in message.iter_parts()}
+
+
+def transcribe(form):
+    """Answers with one word per second of audio, like a transcription that agrees with itself between updates."""
+    import av
+
+    with av.open(io.BytesIO(form["file"])) as container:
+        duration = sum(frame.samples / frame.sample_rate for frame in container.decode(audio=0))
+    segments = [{"id": i, "seek": 0, "start": float(i), "end": min(i + 1.0, duration), "text": " word",
+                 "tokens": [], "temperature": 0.0, "avg_logprob": -0.2, "compression_ratio": 1.0,
+                 "no_speech_prob": 0.01} for i in range(int(duration + 0.5))]
+    text = "".join(segment["text"] for segment in segments).strip()
+    if form.get("response_format") == b"verbose_json":
+        return {"task": "transcribe", "language": "english", "duration": duration, "text": text, "segments": segments}
+    return {"text": text}
+
+
+def synthetic_phrase(seconds, seed=0):
+    """A voiced-sounding signal: a few harmonics of a wandering pitch, in syllable-length bursts, over faint noise."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    pitch = 120 + 30 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+    voiced = sum(np.sin(harmonic * phase) / harmonic for harmonic in range(1, 6))
+    syllables = np.clip(np.sin(2 * np.pi * 4 * t + rng.uniform(0, 2 * np.pi)), 0, None)
+    audio = 0.2 * voiced * syllables + rng.normal(0, 0.005, len(t))
+    return audio.astype(np.float32)
+
+
+def read_phrase(path):
+    with wave.open(path, "rb") as reader:
+        rate, channels, width = reader.getframerate(), reader.getnchannels(), reader.getsampwidth()
+        raw_data = reader.readframes(reader.getnframes())
+    raw_data = dsp.Resampler(rate, SAMPLE_RATE, channels, width).process(raw_data)
+    return np.frombuffer(raw_data, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def run_scenario(server, upload_format, concurrent, phrases):
+    server.reset()
+    model = TranscriberModels.get_backend("api", api_key="stand-in", base_url=server.base_url,
+                                          upload_format=upload_format)
+    model.warm_up()
+    latencies = []
+
+    def transcribe(audio):
+        start = time.perf_counter()
+        text = model.get_transcription(audio)
+        latencies.append(time.perf_counter() - start)
+        return text
+
+    start = time.perf_counter()
+    if concurrent:
+        for i in range(0, len(phrases), 2):
+            list(model.executor.map(transcribe, phrases[i:i + 2]))
+    else:
+        for audio in phrases:
+            transcribe(audio)
+    wall = time.perf_counter() - start
+
+    stats = server.get_stats()
+    return {
+        "format": model.upload_format,
+        "concurrent": concurrent,
+        "wall_seconds": round(wall, 3),
+        "requests": model.get_stats()["requests"],
+        "server_requests": stats["requests"],
+        "retried_errors": stats["errors"],
+        "connections": stats["connections"],
+        "uploaded_bytes": stats["uploaded_bytes"],
+        "bytes_per_request": stats["uploaded_bytes"] // max(stats["requests"], 1),
+        "latency_p50": round(float(np.percentile(latencies, 50)), 4),
+        "latency_p95": round(float(np.percentile(latencies, 95)), 4),
+    }
+
+
+def get_speech_seconds(path):
+    with wave.open(path, "rb") as reader:
+        rate, channels, width = reader.getframerate(), reader.getnchannels(), reader.getsampwidth()
+        raw_data = reader.readframes(reader.getnframes())
+    if channels > 1:
+        raw_data = dsp.tomono(raw_data, width, 1 / channels, 1 / channels)
+    return float((dsp.rms_frames(raw_data, width, int(rate * FRAME_DURATION)) > SPEECH_THRESHOLD).sum() * FRAME_DURATION)
+
+
+def run_pipeline(server, path, streaming, speed):
+    """Replays ``path`` as the speaker through AudioTranscriber with the API backend and counts what it uploads."""
+    server.reset()
+    model = TranscriberModels.get_backend("api", api_key="stand-in", base_url=server.base_url)
+    model.warm_up()
+    recorder = AudioRecorder.FileRecorder(path, "Speaker file", datetime.utcnow(), speed)
+    scheduler = TranscriptionScheduler()
+    channel = scheduler.create_channel(recorder.source)
+    transcriber = AudioTranscriber(None, recorder.source, model, streaming=streaming, scheduler=scheduler,
+                                   recognizers={"Speaker": recorder.recorder})
+
+    start = time.perf_counter()
+    transcribe_thread = threading.Thread(target=transcriber.transcribe_audio_queue, args=(channel, None), daemon=True)
+    transcribe_thread.start()
+    recorder.start(channel, calibrate=False)
+    recorder.finished.wait()
+    recorder.stop()
+    transcriber.stop()
+    transcribe_thread.join()
+    wall = time.perf_counter() - start
+
+    speech_minutes = get_speech_seconds(path) / 60
+    stats = server.get_stats()
+    return {
+        "streaming": streaming,
+        "wall_seconds": round(wall, 3),
+        "speech_minutes": round(speech_minutes, 3),
+        "requests": stats["requests"],
+        "uploaded_bytes": stats["uploaded_bytes"],
+        "bytes_per_speech_minute": round(stats["uploaded_bytes"] / speech_minutes),
+        "requests_per_speech_minute": round(stats["requests"] / speech_minutes, 1),
+        "segments": len(transcriber.transcript.snapshot.segments),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the API backend against a local stand-in server.")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="measure bytes per minute of speech through the whole pipeline, with and without "
+                             "--streaming")
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--seconds", type=float,
+                        help="length of each uploaded phrase, or of the replayed audio with --pipeline "
+                             "(default: 5, or 120 with --pipeline)")
+    parser.add_argument("--speed", type=float, default=4, help="replay speed with --pipeline (default: 4)")
+    parser.add_argument("--audio", help="WAV file to upload or replay instead of synthetic audio")
+    parser.add_argument("--latency", type=float, default=0.15, help="server time per request (default: 0.15)")
+    parser.add_argument("--bandwidth", type=float, default=250000,
+                        help="upload bytes per second, 250000 is a 2 Mbit/s uplink (default: 250000)")
+    parser.add_argument("--error-rate", type=float, default=0.05, help="share of requests answered with a 503")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    server = StandInServer(args.latency, args.bandwidth, args.error_rate).start()
+    if args.pipeline:
+        with tempfile.TemporaryDirectory() as directory:
+            path = args.audio
+            if path is None:
+                path = os.path.join(directory, "speech.wav")
+                # a monologue, its pauses are too short to end the phrase or even the recorded chunk
+                synthetic_speech(path, args.seconds or 120, seed=1, pauses=(0.05, 0.3))
+            results = {"scenarios": []}
+            for streaming in (False, True):
+                with contextlib.redirect_stdout(sys.stderr):
+                    results["scenarios"].append(run_pipeline(server, path, streaming, args.speed))
+                print(json.dumps(results["scenarios"][-1]), file=sys.stderr)
+    else:
+        phrase = read_phrase(args.audio) if args.audio else synthetic_phrase(args.seconds or 5)
+        phrases = [phrase] * args.requests
+        results = {"phrase_seconds": round(len(phrase) / SAMPLE_RATE, 3), "scenarios": []}
+        for upload_format in TranscriberModels.UPLOAD_FORMATS:
+            for concurrent in (False, True):
+                results["scenarios"].append(run_scenario(server, upload_format, concurrent, phrases))
+                print(json.dumps(results["scenarios"][-1]), file=sys.stderr)
+    server.shutdown()
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Measures the CPU time ``Recognizer.listen`` spends on replayed loopback audio for different capture chunk sizes.
+
+Usage: python benchmarks/chunk_size_benchmark.py [loopback recording.wav]
+
+Without a recording, one minute of synthetic 48 kHz stereo audio (noise bursts separated by pauses) is used.
+"""
+import io
+import os
+import sys
+import time
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import custom_speech_recognition as sr
+from custom_speech_recognition import dsp
+from ReplaySource import WaveDeviceStream
+
+TARGET_SAMPLE_RATE = 16000
+ENERGY_THRESHOLD = 1000
+RECORD_TIMEOUT = 3
+
+
+class ReplayLoopback(sr.AudioSource):
+    def __init__(self, wav_bytes, chunk_size):
+        self.wav_bytes = wav_bytes
+        self.chunk_size = chunk_size
+        self.stream = None
+
+    def __enter__(self):
+        reader = wave.open(io.BytesIO(self.wav_bytes), "rb")
+        device_rate, device_channels = reader.getframerate(), reader.getnchannels()
+        self.SAMPLE_WIDTH = reader.getsampwidth()
+        self.SAMPLE_RATE = TARGET_SAMPLE_RATE
+        self.CHUNK = max(1, round(self.chunk_size * TARGET_SAMPLE_RATE / device_rate))
+        resampler = dsp.Resampler(device_rate, TARGET_SAMPLE_RATE, device_channels, self.SAMPLE_WIDTH)
+        self.stream = sr.Microphone.ResamplingMicrophoneStream(WaveDeviceStream(reader), resampler, self.CHUNK, self.chunk_size)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stream = None
+
+
+def synthetic_loopback(seconds=60, sample_rate=48000, channels=2):
+    rng = np.random.default_rng(0)
+    t = np.arange(seconds * sample_rate) / sample_rate
+    speaking = (t % 4) < 2.5  # 2.5 s of "speech" every 4 s
+    audio = rng.normal(0, 200, len(t)) + speaking * rng.normal(0, 6000, len(t))
+    audio = np.repeat(np.clip(audio, -32768, 32767).astype(np.int16), channels)
+    wav_file = io.BytesIO()
+    with wave.open(wav_file, "wb") as writer:
+        writer.setnchannels(channels)
+        writer.setsampwidth(2)
+        writer.setframerate(sample_rate)
+        writer.writeframes(audio.tobytes())
+    return wav_file.getvalue()
+
+
+def run(wav_bytes, chunk_size):
+    recognizer = sr.Recognizer()
+    recognizer.energy_threshold = ENERGY_THRESHOLD
+    recognizer.dynamic_energy_threshold = False
+    phrases = 0
+    start = time.process_time()
+    with ReplayLoopback(wav_bytes, chunk_size) as source:
+        while True:
+            audio = recognizer.listen(source, phrase_time_limit=RECORD_TIMEOUT)
+            if len(audio.frame_data) == 0:
+                break
+            phrases += 1
+    return time.process_time() - start, phrases
+
+
+def main():
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "rb") as f:
+            wav_bytes = f.read()
+    else:
+        wav_bytes = synthetic_loopback()
+    with wave.open(io.BytesIO(wav_bytes), "rb") as reader:
+        device_rate = reader.getframerate()
+        duration = reader.getnframes() / device_rate
+
+    print(f"{duration:.1f} s of {device_rate} Hz audio")
+    print(f"{'chunk size':<28}{'CPU seconds':>12}{'CPU %':>8}{'phrases':>9}")
+    for label, chunk_size in [("2 frames (previous)", 2),
+                              ("10 ms", device_rate // 100),
+                              ("25 ms (default)", device_rate * 25 // 1000),
+                              ("50 ms", device_rate // 20)]:
+        cpu, phrases = run(wav_bytes, chunk_size)
+        print(f"{label:<28}{cpu:>12.3f}{100 * cpu / duration:>8.2f}{phrases:>9}")
+
+
+if __name__ == "__main__":
+    main()
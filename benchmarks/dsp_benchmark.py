@@ -0,0 +1,75 @@
+"""
+Compares the throughput of ``custom_speech_recognition.dsp`` with ``audioop`` (when it is still available).
+
+Usage: python benchmarks/dsp_benchmark.py [seconds of audio]
+"""
+import os
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from custom_speech_recognition import dsp
+
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore", DeprecationWarning)
+    try:
+        import audioop
+    except ImportError:
+        audioop = None
+
+SAMPLE_RATE = 48000
+CHUNK = 1024
+
+
+def measure(func, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def per_chunk(func, fragment, width):
+    step = CHUNK * width
+    return lambda: [func(fragment[i:i + step]) for i in range(0, len(fragment), step)]
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 60
+    mono = os.urandom(int(seconds * SAMPLE_RATE) * 2)
+    stereo = os.urandom(int(seconds * SAMPLE_RATE) * 4)
+
+    cases = [
+        ("rms per 1024-sample chunk",
+         per_chunk(lambda b: dsp.rms(b, 2), mono, 2),
+         audioop and per_chunk(lambda b: audioop.rms(b, 2), mono, 2)),
+        ("rms of all 1024-sample frames at once",
+         lambda: dsp.rms_frames(mono, 2, CHUNK),
+         audioop and per_chunk(lambda b: audioop.rms(b, 2), mono, 2)),
+        ("ratecv 48 kHz -> 16 kHz",
+         lambda: dsp.ratecv(mono, 2, 1, SAMPLE_RATE, 16000, None),
+         audioop and (lambda: audioop.ratecv(mono, 2, 1, SAMPLE_RATE, 16000, None))),
+        ("tomono",
+         lambda: dsp.tomono(stereo, 2, 0.5, 0.5),
+         audioop and (lambda: audioop.tomono(stereo, 2, 0.5, 0.5))),
+        ("lin2lin 16 -> 32 bit",
+         lambda: dsp.lin2lin(mono, 2, 4),
+         audioop and (lambda: audioop.lin2lin(mono, 2, 4))),
+        ("byteswap",
+         lambda: dsp.byteswap(mono, 2),
+         audioop and (lambda: audioop.byteswap(mono, 2))),
+    ]
+
+    print(f"{seconds:g} s of 48 kHz 16-bit audio, speed in seconds of audio per second (higher is better)")
+    print(f"{'operation':<40}{'dsp':>14}{'audioop':>14}")
+    for name, dsp_func, audioop_func in cases:
+        dsp_speed = seconds / measure(dsp_func)
+        audioop_speed = f"{seconds / measure(audioop_func):>14.0f}" if audioop_func else f"{'n/a':>14}"
+        print(f"{name:<40}{dsp_speed:>14.0f}{audioop_speed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""
+Drives the whole recorder -> queue -> AudioTranscriber pipeline with replayed audio and reports, as JSON on stdout:
+
+- finalization latency (p50/p95/p99): from the end of an utterance in the replayed audio to the first transcript
+  update that covers it, in wall-clock seconds
+- real-time factors: time spent in the model, and wall-clock time of the whole run, per second of audio
+- CPU time and peak RSS of the process
+
+Usage: python benchmarks/e2e_benchmark.py [--model tiny.en] [--speed 4 | --unpaced] [--seconds 60]
+                                          [--mic-file mic.wav] [--speaker-file speaker.wav] [--output results.json]
+
+By default a deterministic stub model transcribes one minute of synthetic speech-like audio per source, replayed in
+real time, so the numbers measure the pipeline itself. Pass ``--model`` to use a real local model instead. With
+``--unpaced`` the audio is read as fast as it is transcribed, which measures throughput rather than latency.
+"""
+import argparse
+import contextlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import wave
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import AudioChannel
+import AudioRecorder
+from AudioTranscriber import AudioTranscriber
+from TranscriptionScheduler import TranscriptionScheduler
+from custom_speech_recognition import dsp
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SAMPLE_RATE = 16000
+FRAME_DURATION = 0.02
+SPEECH_THRESHOLD = AudioRecorder.ENERGY_THRESHOLD
+MIN_PAUSE = 0.8  # the recognizer's pause_threshold, shorter pauses don't end an utterance
+
+
+class StubModel(object):
+    """Deterministic stand-in for a transcriber that takes ``rtf`` seconds per second of audio, plus ``overhead``."""
+    def __init__(self, rtf=0.1, overhead=0.02):
+        self.rtf = rtf
+        self.overhead = overhead
+        self.speedup = 1
+
+    def warm_up(self):
+        pass
+
+    def set_fast_decode(self, enabled):
+        # like greedy decoding compared to beam search
+        self.speedup = 2 if enabled else 1
+
+    def get_transcription(self, audio):
+        return " ".join(text for _, _, text in self.get_segments(audio))
+
+    def get_segments(self, audio, initial_prompt=None):
+        duration = len(audio) / SAMPLE_RATE
+        time.sleep((self.overhead + self.rtf * duration) / self.speedup)
+        return [(float(second), min(second + 1.0, duration), f"word{second}") for second in range(int(np.ceil(duration)))]
+
+
+class TimedModel(object):
+    """Wraps a model and adds up the time spent in its ``get_*`` methods."""
+    def __init__(self, model):
+        self.model = model
+        self.busy = 0.0
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __getattr__(self, name):
+        attribute = getattr(self.model, name)
+        if not name.startswith("get_"):
+            return attribute
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return attribute(*args, **kwargs)
+            finally:
+                with self.lock:
+                    self.busy += time.perf_counter() - start
+                    self.calls += 1
+        return timed
+
+
+class LatencyTracker(object):
+    """Records, for every utterance, how long after its end the transcript first covered it."""
+    def __init__(self, utterance_ends, sources, start_time):
+        self.pending = {who_spoke: list(ends) for who_spoke, ends in utterance_ends.items()}
+        self.sources = sources
+        self.start_time = start_time
+        self.latencies = []
+
+    def on_change(self, base_version, snapshot, changes):
+        now = time.perf_counter()
+        for segment in snapshot.segments:
+            pending = self.pending[segment.who_spoke]
+            covered = (segment.time_spoken - self.start_time).total_seconds()
+            source = self.sources[segment.who_spoke]
+            while pending and pending[0] <= covered:
+                self.latencies.append(now - (source.started + pending.pop(0) / source.speed))
+
+    def missed(self):
+        return sum(len(ends) for ends in self.pending.values())
+
+
+def synthetic_speech(path, seconds, seed, pauses=(0.5, 4)):
+    """Writes noise bursts of 1-6 s separated by pauses of ``pauses`` seconds, at 48 kHz stereo like a loopback device."""
+    rng = np.random.default_rng(seed)
+    rate, parts, total = 48000, [], 0.0
+    while total < seconds:
+        for amplitude, duration in ((100, rng.uniform(*pauses)), (6000, rng.uniform(1, 6))):
+            duration = min(duration, seconds - total)
+            parts.append(rng.normal(0, amplitude, int(duration * rate)))
+            total += duration
+    audio = np.clip(np.concatenate(parts + [rng.normal(0, 100, 2 * rate)]), -32768, 32767).astype(np.int16)
+    with wave.open(path, "wb") as writer:
+        writer.setnchannels(2)
+        writer.setsampwidth(2)
+        writer.setframerate(rate)
+        writer.writeframes(np.repeat(audio, 2).tobytes())
+
+
+def find_utterance_ends(path):
+    """Returns the times, in seconds, at which speech in ``path`` is followed by at least ``MIN_PAUSE`` of quiet."""
+    with wave.open(path, "rb") as reader:
+        rate, channels, width = reader.getframerate(), reader.getnchannels(), reader.getsampwidth()
+        raw_data = reader.readframes(reader.getnframes())
+    if channels > 1:
+        raw_data = dsp.tomono(raw_data, width, 1 / channels, 1 / channels)
+    speaking = dsp.rms_frames(raw_data, width, int(rate * FRAME_DURATION)) > SPEECH_THRESHOLD
+    ends, last_speech = [], None
+    for frame, is_speech in enumerate(speaking):
+        if is_speech:
+            last_speech = frame
+        elif last_speech is not None and (frame - last_speech) * FRAME_DURATION >= MIN_PAUSE:
+            ends.append((last_speech + 1) * FRAME_DURATION)
+            last_speech = None
+    if last_speech is not None:
+        ends.append((last_speech + 1) * FRAME_DURATION)
+    return ends
+
+
+def get_resource_usage():
+    if resource is None:
+        return time.process_time(), None
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak_rss = usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    return usage.ru_utime + usage.ru_stime, peak_rss
+
+
+def get_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def percentile(values, q):
+    return round(float(np.percentile(values, q)), 4) if values else None
+
+
+def run(args, files):
+    if args.model:
+        import TranscriberModels
+        model = TranscriberModels.get_backend("local", model=args.model, num_workers=max(args.workers, 1))
+    else:
+        model = StubModel(args.stub_rtf)
+    model.warm_up()
+    model = TimedModel(model)
+
+    start_time = datetime.utcnow()
+    speed = None if args.unpaced else args.speed
+    recorders = {who_spoke: AudioRecorder.FileRecorder(path, who_spoke, start_time, speed)
+                 for who_spoke, path in files.items()}
+    scheduler = TranscriptionScheduler()
+    audio_queues = {who_spoke: scheduler.create_channel(recorder.source, args.queue_size, args.queue_policy,
+                                                        name=who_spoke)
+                    for who_spoke, recorder in recorders.items()}
+    transcriber = AudioTranscriber(recorders["You"].source if "You" in recorders else None,
+                                   recorders["Speaker"].source if "Speaker" in recorders else None, model,
+                                   streaming=args.streaming, scheduler=scheduler, workers=args.workers,
+                                   recognizers={who_spoke: recorder.recorder for who_spoke, recorder in recorders.items()})
+
+    utterance_ends = {who_spoke: find_utterance_ends(path) for who_spoke, path in files.items()}
+    tracker = LatencyTracker(utterance_ends, {who_spoke: recorder.source for who_spoke, recorder in recorders.items()},
+                             start_time)
+    if speed:
+        transcriber.transcript.subscribe(tracker.on_change)
+
+    cpu_start, _ = get_resource_usage()
+    wall_start = time.perf_counter()
+    transcribe = threading.Thread(target=transcriber.transcribe_audio_queue,
+                                  args=(audio_queues.get("Speaker"), audio_queues.get("You")), daemon=True)
+    transcribe.start()
+    for who_spoke, recorder in recorders.items():
+        recorder.start(audio_queues[who_spoke], calibrate=False)
+    for recorder in recorders.values():
+        recorder.finished.wait()
+        recorder.stop()
+    transcriber.stop()
+    transcribe.join()
+    wall = time.perf_counter() - wall_start
+    cpu_end, peak_rss = get_resource_usage()
+
+    audio_seconds = sum(recorder.source.frames_read / recorder.source.SAMPLE_RATE for recorder in recorders.values())
+    latencies = tracker.latencies
+    return {
+        "commit": get_commit(),
+        "model": args.model or f"stub(rtf={args.stub_rtf})",
+        "speed": speed,
+        "streaming": args.streaming,
+        "workers": args.workers,
+        "queue_policy": args.queue_policy,
+        "queues": {who_spoke: audio_queue.get_stats() for who_spoke, audio_queue in audio_queues.items()},
+        "audio_seconds": round(audio_seconds, 3),
+        "wall_seconds": round(wall, 3),
+        "utterances": sum(len(ends) for ends in utterance_ends.values()),
+        "latency": {
+            "count": len(latencies),
+            "missed": tracker.missed() if speed else None,
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": round(max(latencies), 4) if latencies else None,
+        },
+        "inference_calls": model.calls,
+        "gated_seconds": round(transcriber.gated_seconds, 3),
+        "trimmed_seconds": round(transcriber.trimmed_seconds, 3),
+        "inference_rtf": round(model.busy / audio_seconds, 4) if audio_seconds else None,
+        "pipeline_rtf": round(wall / audio_seconds, 4) if audio_seconds else None,
+        "cpu_seconds": round(cpu_end - cpu_start, 3),
+        "peak_rss_mb": round(peak_rss, 1) if peak_rss is not None else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end latency and throughput benchmark.")
+    parser.add_argument("--model", help="local model to benchmark instead of the stub, e.g. tiny.en")
+    parser.add_argument("--stub-rtf", type=float, default=0.1, help="stub seconds per second of audio (default: 0.1)")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed (default: 1, real time)")
+    parser.add_argument("--unpaced", action="store_true", help="replay as fast as possible, measures throughput only")
+    parser.add_argument("--seconds", type=float, default=60, help="seconds of synthetic audio per source (default: 60)")
+    parser.add_argument("--mic-file", help="recording to replay as the microphone instead of synthetic audio")
+    parser.add_argument("--speaker-file", help="recording to replay as the speaker instead of synthetic audio")
+    parser.add_argument("--streaming", action="store_true")
+    parser.add_argument("--workers", type=int, default=0)
+    parser.add_argument("--queue-size", type=int, default=AudioChannel.MAX_QUEUED_CHUNKS)
+    parser.add_argument("--queue-policy", choices=AudioChannel.OVERFLOW_POLICIES, default="coalesce")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        files = {}
+        for seed, (who_spoke, path) in enumerate((("You", args.mic_file), ("Speaker", args.speaker_file))):
+            if path is None and not (args.mic_file or args.speaker_file):
+                path = os.path.join(directory, f"{who_spoke}.wav")
+                synthetic_speech(path, args.seconds, seed)
+            if path is not None:
+                files[who_spoke] = path
+        # keeps the pipeline's own messages out of the JSON
+        with contextlib.redirect_stdout(sys.stderr):
+            results = run(args, files)
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Measures how long importing ``TranscriberModels`` and creating each backend's dependencies takes, in a fresh
+interpreter per measurement so that nothing is already cached in ``sys.modules``.
+
+Usage: python benchmarks/import_benchmark.py [repetitions]
+"""
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# each case is run as ``python -c``; it prints the elapsed seconds and the heavy modules it ended up importing
+CASES = [
+    ("import TranscriberModels", "import TranscriberModels"),
+    ("api backend dependencies", "import TranscriberModels; from openai import OpenAI"),
+    ("local backend dependencies",
+     "import TranscriberModels; TranscriberModels.cuda_available(); from faster_whisper import WhisperModel"),
+    ("import torch (previous device check)", "import torch; torch.cuda.is_available()"),
+]
+
+HEAVY_MODULES = ["torch", "ctranslate2", "faster_whisper", "openai"]
+
+TEMPLATE = """
+import sys, time
+start = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - start
+print(elapsed, ",".join(name for name in {heavy!r} if name in sys.modules))
+"""
+
+
+def run_case(code):
+    script = TEMPLATE.format(code=code, heavy=HEAVY_MODULES)
+    result = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        return None, result.stderr.strip().splitlines()[-1]
+    elapsed, _, modules = result.stdout.strip().splitlines()[-1].partition(" ")
+    return float(elapsed), modules or "-"
+
+
+def main():
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f"median of {repetitions} fresh interpreters")
+    print(f"{'case':<40}{'seconds':>10}  heavy modules loaded")
+    for name, code in CASES:
+        timings, modules = [], None
+        for _ in range(repetitions):
+            elapsed, modules = run_case(code)
+            if elapsed is None:
+                break
+            timings.append(elapsed)
+        if timings:
+            print(f"{name:<40}{statistics.median(timings):>10.3f}  {modules}")
+        else:
+            print(f"{name:<40}{'failed':>10}  {modules}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""Vectorized NumPy replacements for the ``audioop`` functions used by this package (``audioop`` was removed in Python 3.13)."""
+
+import math
+
+import numpy as np
+
+_DTYPES = {1: np.int8, 2: np.int16, 4: np.int32}
+
+
+def to_array(fragment, width):
+    """Returns the signed little-endian samples in ``fragment`` as a NumPy integer array (a zero-copy view where possible)."""
+    if width == 3:
+        raw = np.frombuffer(fragment, dtype=np.uint8)
+        raw = raw[:len(raw) - len(raw) % 3].reshape(-1, 3).astype(np.int32)
+        samples = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        return np.where(samples >= 1 << 23, samples - (1 << 24), samples)
+    return np.frombuffer(fragment, dtype=_DTYPES[width], count=len(fragment) // width)
+
+
+def from_array(samples, width):
+    """Returns the samples in ``samples`` as a byte string of signed little-endian ``width``-byte samples."""
+    if width == 3:
+        samples = samples.astype("<i4").view(np.uint8).reshape(-1, 4)
+        return samples[:, :3].tobytes()
+    return samples.astype(np.dtype(_DTYPES[width]).newbyteorder("<")).tobytes()
+
+
+def _bounds(width):
+    return -(1 << (8 * width - 1)), (1 << (8 * width - 1)) - 1
+
+
+def rms(fragment, width):
+    """Returns the root-mean-square of the samples in ``fragment``, like ``audioop.rms``."""
+    samples = to_array(fragment, width)
+    if len(samples) == 0:
+        return 0
+    samples = samples.astype(np.float64)
+    return int(math.sqrt(np.dot(samples, samples) / len(samples)))
+
+
+def rms_frames(fragment, width, frame_size):
+    """
+    Returns the root-mean-square of every ``frame_size``-sample frame in ``fragment`` as a NumPy array. A trailing partial frame is ignored.
+
+    Sums are accumulated in single precision, so values can differ from ``rms`` by one.
+    """
+    samples = to_array(fragment, width).astype(np.float32)
+    frames = samples[:len(samples) - len(samples) % frame_size].reshape(-1, frame_size)
+    return np.sqrt(np.einsum("ij,ij->i", frames, frames) / frame_size).astype(np.int64)
+
+
+def bias(fragment, width, bias):
+    """Adds ``bias`` to every sample, wrapping around on overflow, like ``audioop.bias``."""
+    bits = 8 * width
+    samples = (to_array(fragment, width).astype(np.int64) + bias) & ((1 << bits) - 1)
+    samples = np.where(samples >= 1 << (bits - 1), samples - (1 << bits), samples)
+    return from_array(samples, width)
+
+
+def lin2lin(fragment, width, newwidth):
+    """Converts samples between 1, 2, 3 and 4-byte widths, like ``audioop.lin2lin``."""
+    if width == newwidth:
+        return bytes(fragment[:len(fragment) - len(fragment) % width])
+    samples = to_array(fragment, width).astype(np.int32)
+    if newwidth > width:
+        samples = samples << (8 * (newwidth - width))
+    else:
+        samples = samples >> (8 * (width - newwidth))
+    return from_array(samples, newwidth)
+
+
+def tomono(fragment, width, lfactor, rfactor):
+    """Mixes interleaved stereo samples down to mono as ``left * lfactor + right * rfactor``, like ``audioop.tomono``."""
+    samples = to_array(fragment, width)
+    samples = samples[:len(samples) - len(samples) % 2].reshape(-1, 2)
+    if lfactor == rfactor == 1:  # plain sum, the common case, stays in integer arithmetic
+        mixed = samples[:, 0].astype(np.int64) + samples[:, 1]
+        return from_array(np.clip(mixed, *_bounds(width)), width)
+    mixed = samples[:, 0] * float(lfactor) + samples[:, 1] * float(rfactor)
+    return from_array(np.floor(np.clip(mixed, *_bounds(width))), width)
+
+
+def add(fragment1, fragment2, width):
+    """Adds two fragments sample by sample, clipping on overflow, like ``audioop.add``."""
+    samples = to_array(fragment1, width).astype(np.int64) + to_array(fragment2, width)
+    return from_array(np.clip(samples, *_bounds(width)), width)
+
+
+def byteswap(fragment, width):
+    """Swaps the byte order of every sample, like ``audioop.byteswap``."""
+    if width in _DTYPES:
+        return np.frombuffer(fragment, dtype=_DTYPES[width], count=len(fragment) // width).byteswap().tobytes()
+    raw = np.frombuffer(fragment, dtype=np.uint8)
+    return raw[:len(raw) - len(raw) % width].reshape(-1, width)[:, ::-1].tobytes()
+
+
+def ratecv(fragment, width, nchannels, inrate, outrate, state):
+    """
+    Converts the sample rate of ``fragment`` from ``inrate`` to ``outrate`` by linear interpolation. Returns ``(converted_fragment, new_state)``.
+
+    Like ``audioop.ratecv``, ``state`` should be ``None`` for the first fragment of a stream and the returned state for each following fragment, so that a stream converted in pieces matches the stream converted at once.
+    """
+    divisor = math.gcd(inrate, outrate)
+    inrate, outrate = inrate // divisor, outrate // divisor
+
+    samples = to_array(fragment, width)
+    samples = samples[:len(samples) - len(samples) % nchannels].reshape(-1, nchannels).astype(np.float64)
+    if state is None:
+        position, previous = outrate, np.zeros(nchannels)  # the first output sample lands on the first input sample
+    else:
+        position, previous = state
+    if len(samples) == 0:
+        return b"", (position, previous)
+
+    # ``extended[i]`` is input sample ``i - 1``; output positions are measured in units of ``1 / outrate`` input samples
+    extended = np.vstack([previous[np.newaxis, :], samples])
+    count = max((len(samples) * outrate - position) // inrate + 1, 0)
+    positions = position + inrate * np.arange(count, dtype=np.int64)
+    index, fraction = positions // outrate, (positions % outrate) / outrate
+    upper = np.minimum(index + 1, len(samples))
+    converted = extended[index] * (1 - fraction[:, np.newaxis]) + extended[upper] * fraction[:, np.newaxis]
+
+    new_state = (position + inrate * count - len(samples) * outrate, samples[-1])
+    return from_array(np.trunc(np.clip(converted, *_bounds(width))).reshape(-1), width), new_state
+
+
+class Resampler(object):
+    """
+    Streaming polyphase resampler that downmixes interleaved ``channels``-channel audio to mono and converts it from ``in_rate`` to ``out_rate``.
+
+    The rate conversion uses a Kaiser-windowed sinc low-pass filter with ``taps_per_phase`` taps per polyphase branch. Filter history is carried across calls to ``process``, so a stream converted in pieces matches the stream converted at once.
+    """
+    def __init__(self, in_rate, out_rate, channels=1, width=2, taps_per_phase=32):
+        divisor = math.gcd(in_rate, out_rate)
+        self.up, self.down = out_rate // divisor, in_rate // divisor
+        self.channels = channels
+        self.width = width
+        self.taps_per_phase = taps_per_phase
+
+        # low-pass filter at the upsampled rate, cutting off just below the lower of the two Nyquist frequencies
+        length = taps_per_phase * self.up
+        cutoff = 0.9 * 0.5 / max(self.up, self.down)
+        n = np.arange(length) - (length - 1) / 2
+        taps = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(length, 8.0)
+        taps *= self.up / taps.sum()
+        # ``filters[phase]`` holds that branch's taps in input order (oldest sample first)
+        self.filters = taps.reshape(taps_per_phase, self.up).T[:, ::-1].astype(np.float32)
+
+        self.history = np.zeros(taps_per_phase - 1, dtype=np.float32)
+        self.position = 0  # upsampled index of the next output sample, relative to the next input fragment
+
+    def process(self, fragment):
+        """Converts the next ``fragment`` of the stream and returns the converted mono samples as bytes."""
+        samples = to_array(fragment, self.width).astype(np.float32)
+        if self.channels > 1:
+            samples = samples[:len(samples) - len(samples) % self.channels].reshape(-1, self.channels).mean(axis=1)
+        if self.up == self.down == 1:
+            return from_array(np.rint(samples), self.width)
+
+        extended = np.concatenate([self.history, samples])
+        count = max((len(samples) * self.up - 1 - self.position) // self.down + 1, 0)
+        if count == 0:
+            self.position -= len(samples) * self.up
+            self.history = extended[len(extended) - (self.taps_per_phase - 1):]
+            return b""
+        positions = self.position + self.down * np.arange(count, dtype=np.int64)
+        windows = np.lib.stride_tricks.sliding_window_view(extended, self.taps_per_phase)[positions // self.up]
+        converted = np.einsum("ij,ij->i", windows, self.filters[positions % self.up])
+
+        self.position += count * self.down - len(samples) * self.up
+        self.history = extended[len(extended) - (self.taps_per_phase - 1):]
+        return from_array(np.rint(np.clip(converted, *_bounds(self.width))), self.width)
+
+    def reset(self):
+        self.history[:] = 0
+        self.position = 0
@@ -0,0 +1,166 @@
+"""
+Runs Ecoute without a UI and writes every finished transcript segment as one JSON object per line.
+
+Live devices:       python headless.py
+A recorded call:    python headless.py --no-mic --speaker-file call.wav --output call.jsonl
+
+With only file sources, the files are transcribed as fast as the model allows, or played at --replay-speed times
+real time, and the program exits at the end of the recordings. With a live device, it runs until interrupted with Ctrl+C.
+"""
+import argparse
+import json
+import sys
+import threading
+from datetime import datetime
+import AudioRecorder
+import AudioTranscriber
+import TranscriberModels
+import AudioChannel
+from TranscriptionScheduler import TranscriptionScheduler
+from TranscriptLog import TranscriptLog
+import Metrics
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Transcribe the microphone and speaker without a UI.")
+    parser.add_argument("--backend", choices=sorted(TranscriberModels.BACKENDS), default="local",
+                        help="transcription backend (default: local)")
+    parser.add_argument("--api", dest="backend", action="store_const", const="api", help="same as --backend api")
+    parser.add_argument("--model", help="model name for the backend (default: tiny.en locally, whisper-1 for the API)")
+    parser.add_argument("--streaming", action="store_true", help="commit stable phrase prefixes, see README")
+    parser.add_argument("--workers", type=int,
+                        help="concurrent transcription workers (default: 2 with the API, so that both sources are "
+                             "uploaded concurrently, otherwise 0)")
+    parser.add_argument("--batched", action="store_true", help="transcribe both sources in one batch")
+
+    sources = parser.add_argument_group("sources")
+    sources.add_argument("--mic-file", help="WAV file to transcribe as the microphone (\"You\")")
+    sources.add_argument("--speaker-file", help="WAV file to transcribe as the speaker (\"Speaker\")")
+    sources.add_argument("--replay-speed", type=float,
+                         help="play the files in real time (1) or N times faster instead of as fast as possible")
+    sources.add_argument("--no-mic", action="store_true", help="don't record the default microphone")
+    sources.add_argument("--no-speaker", action="store_true", help="don't record the default speaker")
+    sources.add_argument("--no-calibrate", action="store_true",
+                         help="skip ambient noise calibration of live devices and use --energy-threshold")
+
+    timing = parser.add_argument_group("timing")
+    timing.add_argument("--phrase-timeout", type=float, default=AudioTranscriber.PHRASE_TIMEOUT,
+                        help="seconds of silence that end a phrase (default: %(default)s)")
+    timing.add_argument("--record-timeout", type=float, default=AudioRecorder.RECORD_TIMEOUT,
+                        help="longest recorded chunk in seconds (default: %(default)s)")
+    timing.add_argument("--energy-threshold", type=float, default=AudioRecorder.ENERGY_THRESHOLD,
+                        help="minimum audio energy considered speech (default: %(default)s)")
+    timing.add_argument("--queue-size", type=int, default=AudioChannel.MAX_QUEUED_CHUNKS,
+                        help="chunks of audio queued per source before --queue-policy applies (default: %(default)s)")
+    timing.add_argument("--queue-policy", choices=AudioChannel.OVERFLOW_POLICIES, default="coalesce",
+                        help="what to do with audio when transcription falls behind, see README (default: %(default)s)")
+
+    output = parser.add_argument_group("output")
+    output.add_argument("--output", help="JSONL file to write segments to (default: stdout)")
+    output.add_argument("--log", help="also keep the session in a transcript log, as in main.py")
+
+    metrics = parser.add_argument_group("metrics")
+    metrics.add_argument("--metrics-port", type=int,
+                         help="serve pipeline metrics in the Prometheus format at http://127.0.0.1:PORT/metrics")
+    metrics.add_argument("--metrics-file", help="write pipeline metrics as JSON to this file periodically and on exit")
+    metrics.add_argument("--metrics-interval", type=float, default=10,
+                         help="seconds between writes of --metrics-file (default: %(default)s)")
+    args = parser.parse_args(argv)
+    if args.workers is None:
+        args.workers = 2 if args.backend == "api" else 0
+    return args
+
+def create_recorders(args, start_time):
+    recorders = {}
+    if args.mic_file:
+        recorders["You"] = AudioRecorder.FileRecorder(args.mic_file, "Mic file", start_time, args.replay_speed)
+    elif not args.no_mic:
+        recorders["You"] = AudioRecorder.DefaultMicRecorder()
+    if args.speaker_file:
+        recorders["Speaker"] = AudioRecorder.FileRecorder(args.speaker_file, "Speaker file", start_time,
+                                                          args.replay_speed)
+    elif not args.no_speaker:
+        recorders["Speaker"] = AudioRecorder.DefaultSpeakerRecorder()
+
+    for recorder in recorders.values():
+        recorder.record_timeout = args.record_timeout
+        recorder.recorder.energy_threshold = args.energy_threshold
+    return recorders
+
+def create_model(args):
+    kwargs = {"model": args.model} if args.model else {}
+    if args.backend == "local":
+        kwargs["num_workers"] = max(args.workers, 1)
+    model = TranscriberModels.get_backend(args.backend, **kwargs)
+    model.warm_up()
+    return model
+
+def write_segment(output, segment, start_time, lock):
+    record = {
+        "id": segment.id,
+        "who_spoke": segment.who_spoke,
+        "text": segment.text,
+        "time_spoken": segment.time_spoken.isoformat(),
+        "offset": round((segment.time_spoken - start_time).total_seconds(), 3),
+    }
+    with lock:
+        output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        output.flush()
+
+def main(argv=None):
+    args = parse_args(argv)
+    start_time = datetime.utcnow()
+    recorders = create_recorders(args, start_time)
+    if not recorders:
+        sys.exit("error: no audio sources, pass --mic-file or --speaker-file or leave a live device enabled")
+
+    model = create_model(args)
+    scheduler = TranscriptionScheduler()
+    sources = {who_spoke: recorder.source for who_spoke, recorder in recorders.items()}
+    audio_queues = {who_spoke: scheduler.create_channel(source, args.queue_size, args.queue_policy, name=who_spoke)
+                    for who_spoke, source in sources.items()}
+    transcriber = AudioTranscriber.AudioTranscriber(sources.get("You"), sources.get("Speaker"), model,
+                                                    streaming=args.streaming, scheduler=scheduler,
+                                                    workers=args.workers, batched=args.batched,
+                                                    log=TranscriptLog(args.log) if args.log else None,
+                                                    phrase_timeout=args.phrase_timeout,
+                                                    recognizers={who_spoke: recorder.recorder
+                                                                 for who_spoke, recorder in recorders.items()})
+
+    if args.metrics_port:
+        Metrics.REGISTRY.start_http_server(args.metrics_port)
+    if args.metrics_file:
+        Metrics.REGISTRY.start_json_dump(args.metrics_file, args.metrics_interval)
+
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    output_lock = threading.Lock()
+    transcriber.transcript.subscribe_finished(
+        lambda segment: write_segment(output, segment, start_time, output_lock))
+
+    transcribe = threading.Thread(target=transcriber.transcribe_audio_queue,
+                                  args=(audio_queues.get("Speaker"), audio_queues.get("You")), daemon=True)
+    transcribe.start()
+    for who_spoke, recorder in recorders.items():
+        is_file = isinstance(recorder, AudioRecorder.FileRecorder)
+        recorder.start(audio_queues[who_spoke], calibrate=not (is_file or args.no_calibrate))
+
+    try:
+        if all(isinstance(recorder, AudioRecorder.FileRecorder) for recorder in recorders.values()):
+            for recorder in recorders.values():
+                recorder.finished.wait()
+        else:
+            threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for recorder in recorders.values():
+            recorder.stop()
+        transcriber.stop()
+        transcribe.join()
+        transcriber.transcript.close()
+        if args.metrics_file:
+            Metrics.REGISTRY.dump_json(args.metrics_file)
+        if output is not sys.stdout:
+            output.close()
+
+if __name__ == "__main__":
+    main()
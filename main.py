@@ -2,28 +2,50 @@ import threading
 from AudioTranscriber import AudioTranscriber
 import customtkinter as ctk
 import AudioRecorder 
-import queue
-import time
 import sys
 import TranscriberModels
+from TranscriptionScheduler import TranscriptionScheduler
+from AudioChannel import MAX_QUEUED_CHUNKS
+from TranscriptLog import TranscriptLog, get_session_path
+from TranscriptRenderer import TranscriptRenderer, write_in_textbox
+import Metrics
+from tkinter import filedialog
+from datetime import timezone
 import subprocess
 
-def write_in_textbox(textbox, text):
-    textbox.delete("0.0", "end")
-    textbox.insert("0.0", text)
-
-def update_transcript_UI(transcriber, textbox):
-    transcript_string = transcriber.get_transcript()
-    write_in_textbox(textbox, transcript_string)
-    textbox.after(300, update_transcript_UI, transcriber, textbox)
+def get_flag_value(flag, default):
+    if flag in sys.argv:
+        index = sys.argv.index(flag)
+        if index + 1 < len(sys.argv):
+            return sys.argv[index + 1]
+    return default
+
+def load_model_and_transcribe(transcriber, speaker_queue, mic_queue, use_api, num_workers):
+    model = TranscriberModels.get_model(use_api, num_workers=num_workers)
+    model.warm_up()
+    transcriber.set_model(model)
+    print("READY")
+    transcriber.transcribe_audio_queue(speaker_queue, mic_queue)
 
 def clear_context(transcriber, speaker_queue, mic_queue):
+    speaker_queue.clear()
+    mic_queue.clear()
     transcriber.clear_transcript_data()
 
-    with speaker_queue.mutex:
-        speaker_queue.queue.clear()
-    with mic_queue.mutex:
-        mic_queue.queue.clear()
+def export_transcript(transcriber):
+    path = filedialog.asksaveasfilename(defaultextension=".txt", filetypes=[("Text files", "*.txt")])
+    if not path:
+        return
+    with open(path, "w", encoding="utf-8") as file:
+        for segment in transcriber.transcript.iter_history():
+            file.write(segment.line)
+
+def show_search_results(transcriber, query, results_textbox):
+    lines = []
+    for segment in transcriber.search_index.search(query):
+        time_spoken = segment.time_spoken.replace(tzinfo=timezone.utc).astimezone()
+        lines.append(f"{time_spoken:%H:%M:%S} {segment.who_spoke}: {segment.text}\n")
+    write_in_textbox(results_textbox, "".join(lines) if lines or not query.strip() else "No matches\n")
 
 def create_ui_components(root, transcriber, speaker_queue, mic_queue):
     ctk.set_appearance_mode("dark")
@@ -40,6 +62,9 @@ def create_ui_components(root, transcriber, speaker_queue, mic_queue):
     main_frame.grid_columnconfigure(0, weight=1)
     main_frame.grid_rowconfigure(0, weight=1)
     main_frame.grid_rowconfigure(1, weight=0)
+    main_frame.grid_rowconfigure(2, weight=0)
+    main_frame.grid_rowconfigure(3, weight=0)
+    main_frame.grid_rowconfigure(4, weight=0)
 
     transcript_textbox = ctk.CTkTextbox(
         main_frame, 
@@ -56,6 +81,30 @@ def create_ui_components(root, transcriber, speaker_queue, mic_queue):
     )
     clear_button.grid(row=1, column=0, sticky="ew", padx=10, pady=(0, 10))
 
+    export_button = ctk.CTkButton(
+        main_frame, 
+        text="Export Transcript", 
+        command=lambda: export_transcript(transcriber)
+    )
+    export_button.grid(row=2, column=0, sticky="ew", padx=10, pady=(0, 10))
+
+    search_entry = ctk.CTkEntry(
+        main_frame, 
+        placeholder_text='Search the session: word, prefix* or "exact phrase"'
+    )
+    search_entry.grid(row=3, column=0, sticky="ew", padx=10, pady=(0, 10))
+
+    search_results_textbox = ctk.CTkTextbox(
+        main_frame, 
+        font=("Arial", 14), 
+        text_color='#FFFCF2', 
+        wrap="word",
+        height=120
+    )
+    search_results_textbox.grid(row=4, column=0, sticky="ew", padx=10, pady=(0, 10))
+    search_entry.bind("<KeyRelease>", lambda event: show_search_results(transcriber, search_entry.get(),
+                                                                        search_results_textbox))
+
     return transcript_textbox
 
 def main():
@@ -66,31 +115,48 @@ def main():
         return
 
     root = ctk.CTk()
-    speaker_queue = queue.Queue()
-    mic_queue = queue.Queue()
-
     user_audio_recorder = AudioRecorder.DefaultMicRecorder()
-    user_audio_recorder.record_into_queue(mic_queue)
-
-    time.sleep(2)
-
     speaker_audio_recorder = AudioRecorder.DefaultSpeakerRecorder()
-    speaker_audio_recorder.record_into_queue(speaker_queue)
-
-    model = TranscriberModels.get_model('--api' in sys.argv)
 
-    transcriber = AudioTranscriber(user_audio_recorder.source, speaker_audio_recorder.source, model)
-    transcribe = threading.Thread(target=transcriber.transcribe_audio_queue, args=(speaker_queue, mic_queue))
+    scheduler = TranscriptionScheduler()
+    queue_size = int(get_flag_value('--queue-size', MAX_QUEUED_CHUNKS))
+    queue_policy = get_flag_value('--queue-policy', "coalesce")
+    speaker_queue = scheduler.create_channel(speaker_audio_recorder.source, queue_size, queue_policy, name="Speaker")
+    mic_queue = scheduler.create_channel(user_audio_recorder.source, queue_size, queue_policy, name="You")
+
+    metrics_port = get_flag_value('--metrics-port', None)
+    if metrics_port:
+        Metrics.REGISTRY.start_http_server(int(metrics_port))
+    metrics_file = get_flag_value('--metrics-file', None)
+    if metrics_file:
+        Metrics.REGISTRY.start_json_dump(metrics_file)
+
+    # both devices calibrate at the same time, and each starts recording as soon as it is done
+    user_audio_recorder.start(mic_queue)
+    speaker_audio_recorder.start(speaker_queue)
+
+    # API requests for the microphone and the speaker are sent concurrently by default
+    workers = int(get_flag_value('--workers', 2 if '--api' in sys.argv else 0))
+    # every session is logged, so that Export Transcript writes all of it and not only the phrases on screen
+    log_path = None if '--no-log' in sys.argv else get_flag_value('--log', None) or get_session_path()
+    transcriber = AudioTranscriber(user_audio_recorder.source, speaker_audio_recorder.source, None,
+                                   streaming='--streaming' in sys.argv, scheduler=scheduler, workers=workers,
+                                   batched='--batched' in sys.argv, log=TranscriptLog(log_path) if log_path else None,
+                                   recognizers={"You": user_audio_recorder.recorder,
+                                                "Speaker": speaker_audio_recorder.recorder})
+
+    # audio recorded while the model loads stays in the channels, coalesced if need be, until the transcriber starts
+    transcribe = threading.Thread(target=load_model_and_transcribe,
+                                  args=(transcriber, speaker_queue, mic_queue, '--api' in sys.argv, max(workers, 1)))
     transcribe.daemon = True
     transcribe.start()
 
     transcript_textbox = create_ui_components(root, transcriber, speaker_queue, mic_queue)
 
-    print("READY")
-
-    update_transcript_UI(transcriber, transcript_textbox)
+    TranscriptRenderer(root, transcript_textbox, transcriber.transcript)
 
     root.mainloop()
+    transcriber.transcript.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,59 @@
+import random
+import unittest
+
+from AudioBuffer import AudioRingBuffer
+
+
+class AudioRingBufferTest(unittest.TestCase):
+    def test_wraps_around_contiguously(self):
+        buffer = AudioRingBuffer(8)
+        buffer.append(b"abcdef")
+        buffer.consume(4)
+        self.assertEqual(buffer.append(b"ghijk"), 0)
+        self.assertEqual(bytes(buffer.view()), b"efghijk")
+        self.assertEqual(buffer.free(), 1)
+
+    def test_overflow_drops_the_oldest_bytes(self):
+        buffer = AudioRingBuffer(8)
+        buffer.append(b"abcdef")
+        self.assertEqual(buffer.append(b"ghijk"), 3)
+        self.assertEqual(bytes(buffer.view()), b"defghijk")
+        self.assertEqual(buffer.append(b"0123456789"), 10)
+        self.assertEqual(bytes(buffer.view()), b"23456789")
+
+    def test_consume_and_clear(self):
+        buffer = AudioRingBuffer(8)
+        buffer.append(b"abc")
+        buffer.consume(10)
+        self.assertEqual(len(buffer), 0)
+        buffer.append(b"defg")
+        buffer.clear()
+        self.assertEqual(bytes(buffer.view()), b"")
+        buffer.append(b"hi")
+        self.assertEqual(bytes(buffer.view()), b"hi")
+
+    def test_matches_a_bytes_model(self):
+        rng = random.Random(0)
+        for capacity in (1, 7, 64):
+            buffer, expected = AudioRingBuffer(capacity), b""
+            for step in range(2000):
+                operation = rng.random()
+                if operation < 0.6:
+                    data = bytes(rng.randrange(256) for _ in range(rng.randrange(2 * capacity + 1)))
+                    dropped = buffer.append(data)
+                    expected += data
+                    self.assertEqual(dropped, max(len(expected) - capacity, 0))
+                    expected = expected[-capacity:]
+                elif operation < 0.95:
+                    size = rng.randrange(capacity + 2)
+                    buffer.consume(size)
+                    expected = expected[size:]
+                else:
+                    buffer.clear()
+                    expected = b""
+                self.assertEqual(bytes(buffer.view()), expected, f"capacity {capacity}, step {step}")
+                self.assertEqual(buffer.free(), capacity - len(expected))
+
+
+if __name__ == "__main__":
+    unittest.main()
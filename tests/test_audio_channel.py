@@ -0,0 +1,63 @@
+import unittest
+from datetime import datetime, timedelta
+
+from AudioChannel import AudioChannel
+from TranscriptionScheduler import TranscriptionScheduler
+
+START = datetime(2024, 1, 1)
+
+
+class FakeSource:
+    SAMPLE_RATE = 10
+    SAMPLE_WIDTH = 1
+    channels = 1
+
+
+def chunk(data, seconds_spoken):
+    return data, START + timedelta(seconds=seconds_spoken)
+
+
+class AudioChannelTest(unittest.TestCase):
+    def create_channel(self, policy="coalesce", maxsize=2):
+        return AudioChannel(TranscriptionScheduler(), FakeSource(), maxsize, policy)
+
+    def drain(self, channel):
+        chunks = []
+        while not channel.empty():
+            data, time_spoken = channel.get_nowait()
+            chunks.append((data, (time_spoken - START).total_seconds()))
+        return chunks
+
+    def test_coalesced_chunks_keep_their_own_timestamps(self):
+        channel = self.create_channel()
+        for data, seconds_spoken in ((b"a", 1), (b"b", 2), (b"c", 3), (b"d", 10)):
+            channel.put(chunk(data, seconds_spoken))
+        self.assertEqual(len(channel), 2)
+        self.assertEqual(self.drain(channel), [(b"a", 1), (b"b", 2), (b"c", 3), (b"d", 10)])
+        self.assertEqual(channel.get_stats()["coalesced"], 2)
+
+    def test_drops_the_oldest_slot_once_the_newest_is_full(self):
+        channel = self.create_channel()
+        channel.put(chunk(b"a" * 200, 1))
+        channel.put(chunk(b"b" * 200, 2))
+        channel.put(chunk(b"c" * 50, 3))
+        channel.put(chunk(b"d" * 100, 4))
+        self.assertEqual([data[:1] for data, _ in self.drain(channel)], [b"b", b"c", b"d"])
+        self.assertEqual(channel.get_stats()["dropped"], 1)
+
+    def test_drop_oldest(self):
+        channel = self.create_channel("drop_oldest")
+        for data, seconds_spoken in ((b"a", 1), (b"b", 2), (b"c", 3)):
+            channel.put(chunk(data, seconds_spoken))
+        self.assertEqual(self.drain(channel), [(b"b", 2), (b"c", 3)])
+
+    def test_clear_counts_every_chunk(self):
+        channel = self.create_channel()
+        for seconds_spoken in range(5):
+            channel.put(chunk(b"a", seconds_spoken))
+        self.assertEqual(channel.clear(), 5)
+        self.assertTrue(channel.empty())
+
+
+if __name__ == "__main__":
+    unittest.main()
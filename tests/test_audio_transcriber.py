@@ -0,0 +1,287 @@
+import queue
+import threading
+import unittest
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from AudioTranscriber import AudioTranscriber, PHRASE_TIMEOUT, STREAMING_MAX_BUFFER, STREAMING_OVERLAP, TRIM_PADDING
+from TranscriptionScheduler import TranscriptionScheduler
+
+SAMPLE_RATE = 16000
+START = datetime(2024, 1, 1)
+
+
+class FakeSource:
+    SAMPLE_RATE = SAMPLE_RATE
+    SAMPLE_WIDTH = 2
+    channels = 1
+
+
+class BlockingModel:
+    """Transcribes every call as the length of its audio, once the test releases it."""
+    def __init__(self):
+        self.released = threading.Semaphore(0)
+
+    def get_segments(self, audio, initial_prompt=None):
+        self.released.acquire()
+        duration = len(audio) / SAMPLE_RATE
+        return [(0.0, duration, f"{duration:.1f}s")]
+
+    def get_transcription(self, audio):
+        return self.get_segments(audio)[0][2]
+
+
+class FakeRecognizer:
+    def __init__(self, energy_threshold):
+        self.energy_threshold = energy_threshold
+
+
+def speech(seconds, seed=0, rms=6000):
+    samples = np.random.default_rng(seed).normal(0, rms, int(seconds * SAMPLE_RATE))
+    return np.clip(samples, -32768, 32767).astype(np.int16).tobytes()
+
+
+class ScriptedModel:
+    """Returns the next of ``script``'s segment lists on every call, and records the calls."""
+    def __init__(self, script):
+        self.script = iter(script)
+        self.calls = []
+
+    def get_segments(self, audio, initial_prompt=None):
+        self.calls.append((len(audio) / SAMPLE_RATE, initial_prompt))
+        return next(self.script)
+
+
+def silence(seconds):
+    return bytes(2 * int(seconds * SAMPLE_RATE))
+
+
+class SlowDecodeTest(unittest.TestCase):
+    """A phrase ends while its source's job is still in flight, as when a decode takes longer than the phrase timeout."""
+    def setUp(self):
+        self.model = BlockingModel()
+        self.audio_queue = queue.Queue()
+
+    def create_transcriber(self, streaming):
+        transcriber = AudioTranscriber(FakeSource(), None, self.model, streaming=streaming, workers=2)
+        self.addCleanup(transcriber.executor.shutdown, wait=False, cancel_futures=True)
+        self.addCleanup(self.model.released.release, 10)
+        return transcriber
+
+    def put(self, transcriber, data, seconds_spoken):
+        self.audio_queue.put((data, START + timedelta(seconds=seconds_spoken)))
+        transcriber.drain_audio_queue("You", self.audio_queue)
+        transcriber.submit_transcriptions(["You"])
+
+    def finish_job(self, transcriber):
+        self.model.released.release()
+        self.assertTrue(transcriber.scheduler.wait(timeout=5))
+        transcriber.commit_transcriptions()
+        transcriber.submit_transcriptions(["You"])
+
+    def get_lines(self, transcriber):
+        return [segment.text for segment in reversed(transcriber.transcript.snapshot.segments)]
+
+    def test_audio_arriving_after_the_job_is_transcribed_with_its_phrase(self):
+        for streaming in (False, True):
+            with self.subTest(streaming=streaming):
+                transcriber = self.create_transcriber(streaming)
+                self.put(transcriber, speech(1), 1)
+                self.put(transcriber, speech(1, seed=1), 2)
+                self.assertEqual(transcriber.in_flight["You"], 1)
+                self.put(transcriber, speech(1, seed=2), 2 + PHRASE_TIMEOUT + 1)
+                self.assertEqual(transcriber.in_flight["You"], 1)
+
+                for _ in range(3):
+                    self.finish_job(transcriber)
+                self.assertEqual(self.get_lines(transcriber), ["2.0s", "1.0s"])
+                self.assertTrue(transcriber.is_idle([self.audio_queue]))
+
+    def test_phrase_ending_during_its_last_job_keeps_the_result(self):
+        for streaming in (False, True):
+            with self.subTest(streaming=streaming):
+                transcriber = self.create_transcriber(streaming)
+                self.put(transcriber, speech(1.5), 1)
+                self.put(transcriber, speech(1, seed=1), 1 + PHRASE_TIMEOUT + 1)
+
+                self.finish_job(transcriber)
+                self.finish_job(transcriber)
+                self.assertEqual(self.get_lines(transcriber), ["1.5s", "1.0s"])
+
+    def test_phrases_ending_behind_a_job_in_flight_are_committed_in_order(self):
+        for streaming in (False, True):
+            with self.subTest(streaming=streaming):
+                transcriber = self.create_transcriber(streaming)
+                seconds_spoken = 0
+                for phrase, seconds in enumerate((1, 1.5, 0.5)):
+                    seconds_spoken += PHRASE_TIMEOUT + 2
+                    self.put(transcriber, speech(1, seed=phrase), seconds_spoken)
+                    self.put(transcriber, speech(seconds, seed=phrase), seconds_spoken + 1)
+                    self.assertEqual(transcriber.in_flight["You"], 1)
+
+                # the first chunk's job, then one final job per phrase
+                for _ in range(4):
+                    self.finish_job(transcriber)
+                self.assertEqual(self.get_lines(transcriber), ["2.0s", "2.5s", "1.5s"])
+                self.assertTrue(transcriber.is_idle([self.audio_queue]))
+
+    def test_clear_waits_for_the_transcription_thread(self):
+        transcriber = self.create_transcriber(False)
+        self.put(transcriber, speech(1), 1)
+        self.put(transcriber, speech(1, seed=1), 2)
+        transcriber.clear_transcript_data()
+        self.assertTrue(transcriber.scheduler.wait(timeout=0))
+        self.assertEqual(transcriber.get_sample_duration("You"), 2)
+
+        # the result of the job in flight belongs to the cleared phrase
+        self.finish_job(transcriber)
+        self.assertEqual(transcriber.get_sample_duration("You"), 0)
+        self.assertFalse(transcriber.audio_sources["You"]["pending_time"])
+        self.assertEqual(self.get_lines(transcriber), [])
+        self.put(transcriber, speech(0.5, seed=2), 3)
+        self.finish_job(transcriber)
+        self.assertEqual(self.get_lines(transcriber), ["0.5s"])
+
+
+class StreamingTest(unittest.TestCase):
+    """One phrase transcribed in successive streaming jobs, with segment times relative to the trimmed audio."""
+    def test_committed_text_and_buffer_across_jobs(self):
+        offset = 1 - TRIM_PADDING  # the leading second of silence is cut, but the padding
+        model = ScriptedModel([
+            [(0.0, 1.0, "Hello"), (1.0, 2.3, "world")],
+            [(0.0, 1.0, "hello."), (1.0, 2.3, "world"), (2.3, 4.3, "again")],
+            # the first segment is centred inside the overlap kept from the last commit
+            [(0.0, 0.3, "world"), (0.3, 2.0, "again"), (2.0, 4.2, "more")],
+            # nothing agrees, but the buffer is longer than STREAMING_MAX_BUFFER
+            [(0.0, 5.0, "alpha"), (5.0, 10.0, "beta"), (10.0, 16.4, "gamma")],
+        ])
+        transcriber = AudioTranscriber(FakeSource(), None, model, streaming=True)
+        source_info = transcriber.audio_sources["You"]
+        audio_queue = queue.Queue()
+        expected = [
+            # chunk, text, committed text, overlap, and seconds left in the buffer once it is cut at the end of the
+            # last committed segment, but the overlap: at 3.0 - 0.2, 2.0 - 0.2 and 10.0 - 0.2 seconds
+            (silence(1) + speech(2), "Hello world", "", 0, 3),
+            (speech(2, seed=1), "hello. world again", "hello. world", STREAMING_OVERLAP, 5 - 2.8),
+            (speech(2, seed=2), "hello. world again more", "hello. world again", STREAMING_OVERLAP, 2.2 + 2 - 1.8),
+            (speech(14, seed=3), "hello. world again alpha beta gamma", "hello. world again alpha beta",
+             STREAMING_OVERLAP, 2.4 + 14 - 9.8),
+        ]
+        for seconds_spoken, (chunk, text, committed_text, overlap, buffered) in enumerate(expected):
+            with self.subTest(job=seconds_spoken):
+                audio_queue.put((chunk, START + timedelta(seconds=seconds_spoken)))
+                transcriber.drain_audio_queue("You", audio_queue)
+                transcriber.submit_transcriptions(["You"])
+                transcriber.commit_transcriptions()
+                self.assertEqual(transcriber.transcript.snapshot.segments[0].text, text)
+                self.assertEqual(source_info["committed_text"], committed_text)
+                self.assertAlmostEqual(source_info["overlap"], overlap)
+                self.assertAlmostEqual(transcriber.get_sample_duration("You"), buffered)
+        self.assertEqual(len(transcriber.transcript.snapshot.segments), 1)
+        self.assertGreater(model.calls[-1][0], STREAMING_MAX_BUFFER)
+
+        # the first two jobs' audio starts with the silence that was cut, the others start with speech
+        durations, prompts = zip(*model.calls)
+        for duration, expected_duration in zip(durations, (3 - offset, 5 - offset, 4.2, 16.4)):
+            self.assertAlmostEqual(duration, expected_duration)
+        self.assertEqual(prompts, (None, None, "hello. world", "hello. world again"))
+
+
+class CoalescedChannelTest(unittest.TestCase):
+    def test_coalesced_chunks_of_one_utterance_stay_one_phrase(self):
+        # a 9 s utterance recorded as three 3 s chunks, queued while the transcriber was busy
+        for maxsize in (10, 1):
+            with self.subTest(maxsize=maxsize):
+                model = BlockingModel()
+                model.released.release(10)
+                transcriber = AudioTranscriber(FakeSource(), None, model)
+                channel = TranscriptionScheduler().create_channel(FakeSource(), maxsize)
+                for i in range(3):
+                    channel.put((speech(3, seed=i), START + timedelta(seconds=3 * (i + 1))))
+                    if i == 0:
+                        # the last two chunks arrive while the transcriber is busy with the first
+                        transcriber.drain_audio_queue("You", channel)
+                transcriber.drain_audio_queue("You", channel)
+                transcriber.submit_transcriptions(["You"])
+                transcriber.commit_transcriptions()
+                lines = [segment.text for segment in transcriber.transcript.snapshot.segments]
+                self.assertEqual(lines, ["9.0s"])
+
+
+class SilentPhraseTest(unittest.TestCase):
+    """The segment of a phrase is finished once its source has been silent for the phrase timeout."""
+    def create_transcriber(self, clock, phrase_timeout=PHRASE_TIMEOUT):
+        model = BlockingModel()
+        model.released.release(10)
+        transcriber = AudioTranscriber(FakeSource(), None, model, phrase_timeout=phrase_timeout, clock=clock)
+        finished = []
+        transcriber.transcript.subscribe_finished(lambda segment: finished.append(segment.text))
+        return transcriber, finished
+
+    def test_silent_phrase_is_finished_once(self):
+        now = [START]
+        transcriber, finished = self.create_transcriber(lambda: now[0])
+        audio_queue = queue.Queue()
+        for data, seconds_spoken in ((speech(1), 1), (speech(0.5, seed=1), 1 + PHRASE_TIMEOUT + 1)):
+            audio_queue.put((data, START + timedelta(seconds=seconds_spoken)))
+            transcriber.drain_audio_queue("You", audio_queue)
+            transcriber.submit_transcriptions(["You"])
+            transcriber.commit_transcriptions()
+
+            now[0] = START + timedelta(seconds=seconds_spoken + PHRASE_TIMEOUT - 1)
+            self.assertAlmostEqual(transcriber.finish_silent_phrases(), 1)
+            now[0] = START + timedelta(seconds=seconds_spoken + PHRASE_TIMEOUT + 0.5)
+            self.assertIsNone(transcriber.finish_silent_phrases())
+            self.assertEqual(transcriber.get_sample_duration("You"), 0)
+
+        self.assertEqual(finished, ["1.0s", "0.5s"])
+        transcriber.transcript.close()
+        self.assertEqual(finished, ["1.0s", "0.5s"])
+        self.assertEqual(len(transcriber.transcript.snapshot.segments), 2)
+
+    def test_transcription_thread_finishes_segments_without_new_audio(self):
+        transcriber, finished = self.create_transcriber(datetime.utcnow, phrase_timeout=0.1)
+        done = threading.Event()
+        transcriber.transcript.subscribe_finished(lambda segment: done.set())
+        channel = transcriber.scheduler.create_channel(FakeSource())
+        thread = threading.Thread(target=transcriber.transcribe_audio_queue, args=(None, channel), daemon=True)
+        thread.start()
+        channel.put((speech(1), datetime.utcnow()))
+        self.assertTrue(done.wait(timeout=5))
+        transcriber.stop()
+        thread.join(timeout=5)
+        self.assertEqual(finished, ["1.0s"])
+
+
+class SilenceGateTest(unittest.TestCase):
+    def measure(self, transcriber, chunks):
+        for data in chunks:
+            transcriber.measure_speech("You", data)
+        return transcriber.gate_silence("You")
+
+    def test_audio_louder_than_the_energy_threshold_is_never_gated(self):
+        # quiet speech over a loud background, which the recorder still takes for speech
+        transcriber = AudioTranscriber(FakeSource(), None, BlockingModel(), recognizers={"You": FakeRecognizer(500)})
+        self.assertTrue(self.measure(transcriber, [speech(2, seed, rms=300) for seed in range(3)]))
+        self.assertFalse(self.measure(transcriber, [speech(2, 3, rms=300) + speech(1, 4, rms=800)]))
+
+    def test_the_threshold_follows_the_recognizer(self):
+        recognizer = FakeRecognizer(1000)
+        transcriber = AudioTranscriber(FakeSource(), None, BlockingModel(), recognizers={"You": recognizer})
+        self.assertTrue(self.measure(transcriber, [speech(1, rms=300), speech(1, 1, rms=800)]))
+        recognizer.energy_threshold = 500  # e.g. after calibrating
+        self.assertFalse(self.measure(transcriber, [speech(1, 2, rms=800)]))
+
+    def test_trimming_keeps_audio_louder_than_the_energy_threshold(self):
+        transcriber = AudioTranscriber(FakeSource(), None, BlockingModel(), recognizers={"You": FakeRecognizer(500)})
+        self.measure(transcriber, [speech(2, rms=300)])
+        audio = np.frombuffer(speech(2, 1, rms=300) + speech(1, 2, rms=800) + speech(2, 3, rms=300),
+                              dtype=np.int16).astype(np.float32) / 32768
+        trimmed, offset = transcriber.trim_silence("You", audio)
+        self.assertAlmostEqual(offset, 2 - TRIM_PADDING, delta=0.05)
+        self.assertAlmostEqual(len(trimmed) / SAMPLE_RATE, 1 + 2 * TRIM_PADDING, delta=0.1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import argparse
+import unittest
+
+import numpy as np
+
+import batch_transcribe
+from batch_transcribe import SAMPLE_RATE, split_at_silence
+
+
+def pcm(rng, seconds, rms):
+    return np.clip(rng.normal(0, rms, int(seconds * SAMPLE_RATE)), -32768, 32767).astype(np.int16).tobytes()
+
+
+class SplitAtSilenceTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.audio = b"".join(pcm(rng, rng.uniform(0.2, 5), rms) for _ in range(20) for rms in (50, 3000))
+
+    def split(self, window_duration, max_duration=8):
+        window_size = 2 * int(window_duration * SAMPLE_RATE)
+        windows = (self.audio[i:i + window_size] for i in range(0, len(self.audio), window_size))
+        return [(start, samples.tobytes()) for start, samples in split_at_silence(windows, 4, max_duration)]
+
+    def test_windows_split_like_the_whole_recording(self):
+        whole = self.split(len(self.audio))
+        self.assertGreater(len(whole), 5)
+        for window_duration in (0.01, 1, 8, 13.7):
+            with self.subTest(window_duration=window_duration):
+                self.assertEqual(self.split(window_duration), whole)
+
+    def test_chunks_are_at_most_max_duration_and_cover_the_speech(self):
+        chunks = self.split(3)
+        self.assertTrue(all(len(samples) <= 2 * 8 * SAMPLE_RATE for _, samples in chunks))
+        for (start, samples), (next_start, _) in zip(chunks, chunks[1:]):
+            self.assertLessEqual(start + len(samples) / (2 * SAMPLE_RATE), next_start + 1e-9)
+
+
+class ParseArgsTest(unittest.TestCase):
+    def test_rejects_fewer_than_one_worker(self):
+        with self.assertRaises(argparse.ArgumentTypeError):
+            batch_transcribe.positive_int("0")
+        self.assertEqual(batch_transcribe.parse_args(["--workers", "3", "a.wav"]).workers, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
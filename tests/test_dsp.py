@@ -0,0 +1,117 @@
+import unittest
+import warnings
+
+import numpy as np
+
+from custom_speech_recognition import dsp
+
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore", DeprecationWarning)
+    try:
+        import audioop
+    except ImportError:  # removed in Python 3.13
+        audioop = None
+
+WIDTHS = (1, 2, 3, 4)
+SAMPLE_COUNTS = (0, 1, 7, 1000)  # an even count of stereo frames, which tomono needs, is 1000
+
+
+def fragment(width, count, seed=0):
+    """Random samples over the whole range of ``width``, starting with the extremes."""
+    low, high = -(1 << (8 * width - 1)), (1 << (8 * width - 1)) - 1
+    samples = np.random.default_rng(seed).integers(low, high, count, endpoint=True)
+    samples[:2] = [low, high][:count]
+    return dsp.from_array(samples, width)
+
+
+@unittest.skipIf(audioop is None, "audioop is not available")
+class AudioopTest(unittest.TestCase):
+    """Every replacement gives audioop's results, and ignores a trailing partial sample that audioop rejects."""
+    def check(self, function, *args):
+        for width in WIDTHS:
+            for count in SAMPLE_COUNTS:
+                with self.subTest(function=function, width=width, count=count):
+                    data = fragment(width, count)
+                    expected = getattr(audioop, function)(data, width, *args)
+                    self.assertEqual(getattr(dsp, function)(data, width, *args), expected)
+                    if width > 1:
+                        self.assertEqual(getattr(dsp, function)(data + b"\x01", width, *args), expected)
+
+    def test_rms(self):
+        self.check("rms")
+
+    def test_bias(self):
+        for value in (0, 3, -100, 1 << 7, -(1 << 20)):
+            self.check("bias", value)
+
+    def test_lin2lin(self):
+        for newwidth in WIDTHS:
+            self.check("lin2lin", newwidth)
+
+    def test_tomono(self):
+        for width in WIDTHS:
+            for count in (0, 1000):
+                data = fragment(width, count)
+                for lfactor, rfactor in ((1, 1), (0.5, 0.5), (1, 0), (0.3, 0.9)):
+                    with self.subTest(width=width, count=count, factors=(lfactor, rfactor)):
+                        expected = audioop.tomono(data, width, lfactor, rfactor)
+                        self.assertEqual(dsp.tomono(data, width, lfactor, rfactor), expected)
+                        self.assertEqual(dsp.tomono(data + fragment(width, 1), width, lfactor, rfactor), expected)
+
+    def test_add(self):
+        for width in WIDTHS:
+            for count in SAMPLE_COUNTS:
+                with self.subTest(width=width, count=count):
+                    data1, data2 = fragment(width, count), fragment(width, count, seed=1)
+                    self.assertEqual(dsp.add(data1, data2, width), audioop.add(data1, data2, width))
+
+    def test_byteswap(self):
+        self.check("byteswap")
+
+    def test_ratecv_is_within_one_step(self):
+        for width in WIDTHS:
+            for nchannels in (1, 2):
+                for inrate, outrate in ((44100, 16000), (16000, 48000), (8000, 16000), (16000, 16000)):
+                    with self.subTest(width=width, nchannels=nchannels, rates=(inrate, outrate)):
+                        data = fragment(width, 4410 * nchannels)
+                        expected, _ = audioop.ratecv(data, width, nchannels, inrate, outrate, None)
+                        converted, _ = dsp.ratecv(data, width, nchannels, inrate, outrate, None)
+                        self.assertEqual(len(converted), len(expected))
+                        difference = (dsp.to_array(converted, width).astype(np.int64)
+                                      - dsp.to_array(expected, width))
+                        self.assertLessEqual(np.abs(difference).max(initial=0), 1)
+
+
+class RatecvTest(unittest.TestCase):
+    def test_pieces_match_the_whole_stream(self):
+        data = fragment(2, 2 * 4410)
+        whole, _ = dsp.ratecv(data, 2, 2, 44100, 16000, None)
+        pieces, state = [], None
+        for start in range(0, len(data), 4 * 333):
+            converted, state = dsp.ratecv(data[start:start + 4 * 333], 2, 2, 44100, 16000, state)
+            pieces.append(converted)
+        self.assertEqual(b"".join(pieces), whole)
+
+
+class ResamplerTest(unittest.TestCase):
+    def test_pieces_match_the_whole_stream(self):
+        rng = np.random.default_rng(0)
+        for channels in (1, 2):
+            for in_rate, out_rate in ((44100, 16000), (48000, 16000), (8000, 16000), (16000, 16000)):
+                with self.subTest(channels=channels, rates=(in_rate, out_rate)):
+                    data = dsp.from_array(rng.normal(0, 3000, in_rate * channels).astype(np.int64), 2)
+                    whole = dsp.Resampler(in_rate, out_rate, channels).process(data)
+                    self.assertEqual(len(whole) // 2, out_rate)
+
+                    resampler, pieces, start = dsp.Resampler(in_rate, out_rate, channels), [], 0
+                    frame = 2 * channels
+                    while start < len(data):
+                        # pieces down to a single frame, like the buffers of an audio device
+                        size = frame * int(rng.integers(1, 2000))
+                        pieces.append(resampler.process(data[start:start + size]))
+                        start += size
+                    self.assertEqual(b"".join(pieces), whole)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from TranscriptLog import INDEX_RECORD, TranscriptLog
+from TranscriptStore import TranscriptSegment, TranscriptStore
+
+START = datetime(2024, 1, 1)
+
+
+def segment(id, who_spoke="You", seconds_spoken=0):
+    return TranscriptSegment(id, who_spoke, f"phrase {id}", START + timedelta(seconds=seconds_spoken))
+
+
+class TranscriptLogTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "meeting.jsonl")
+
+    def open_log(self):
+        log = TranscriptLog(self.path)
+        self.addCleanup(log.close)
+        return log
+
+    def test_appended_segments_are_readable_after_flush(self):
+        log = self.open_log()
+        for id in range(600):
+            log.append(segment(id, seconds_spoken=id))
+        log.flush()
+        self.assertEqual(len(log), 600)
+        self.assertEqual([s.id for s in log.read(10, 13)], [10, 11, 12])
+        self.assertEqual([s.id for s in log], list(range(600)))
+        read = log.read(599)[0]
+        self.assertEqual((read.who_spoke, read.text, read.time_spoken), ("You", "phrase 599", START + timedelta(seconds=599)))
+
+    def test_reopening_starts_a_new_session(self):
+        log = self.open_log()
+        for id in range(3):
+            log.append(segment(id))
+        log.close()
+
+        log = self.open_log()
+        for id in range(2):
+            log.append(segment(id))
+        log.flush()
+        self.assertEqual(log.session_start, 3)
+        self.assertEqual(len(log), 5)
+        self.assertEqual([s.text for s in log.iter_session()], ["phrase 0", "phrase 1"])
+        with open(self.path, encoding="utf-8") as f:
+            sessions = [json.loads(line)["session"] for line in f]
+        self.assertEqual(len(set(sessions[:3])), 1)
+        self.assertEqual(set(sessions[3:]), {log.session})
+        self.assertNotEqual(sessions[0], log.session)  # opened within the same second
+
+    def test_partial_index_record_is_dropped(self):
+        log = self.open_log()
+        log.append(segment(0))
+        log.close()
+        with open(self.path + ".idx", "ab") as f:
+            f.write(b"\0" * (INDEX_RECORD.size - 1))
+        self.assertEqual(len(self.open_log()), 1)
+
+    def test_history_only_covers_the_current_session(self):
+        for session in range(2):
+            store = TranscriptStore(("You", "Speaker"), 2, self.open_log())
+            for i in range(6):
+                store.add("You" if i % 2 else "Speaker", f"session {session} phrase {i}", START + timedelta(seconds=i))
+            store.finish_last("You")  # logged, but still in the transcript
+            history = [s.text for s in store.iter_history()]
+            self.assertEqual(history, [f"session {session} phrase {i}" for i in range(6)])
+            self.assertEqual(len({s.id for s in store.iter_history()}), 6)
+            store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+import random
+import unittest
+from datetime import datetime, timedelta
+
+from TranscriptRenderer import TranscriptRenderer
+from TranscriptStore import TranscriptSegment, TranscriptStore, diff_segments
+
+START = datetime(2024, 1, 1)
+
+
+class FakeTextbox:
+    """Keeps text like a Tk text widget, with indexes of the form ``"line.column"`` and ``"end"``."""
+    def __init__(self):
+        self.text = ""
+
+    def get_offset(self, index):
+        if index == "end":
+            return len(self.text)
+        line, column = (int(part) for part in index.split("."))
+        lines = self.text.split("\n")
+        if line < 1:
+            return 0
+        if line > len(lines):
+            return len(self.text)
+        return sum(len(text) + 1 for text in lines[:line - 1]) + min(column, len(lines[line - 1]))
+
+    def delete(self, start, end):
+        start, end = self.get_offset(start), self.get_offset(end)
+        self.text = self.text[:start] + self.text[end:]
+
+    def insert(self, index, text):
+        offset = self.get_offset(index)
+        self.text = self.text[:offset] + text + self.text[offset:]
+
+
+class FakeRoot:
+    def __init__(self):
+        self.callbacks = []
+
+    def after(self, milliseconds, callback):
+        self.callbacks.append(callback)
+
+    def run_callbacks(self):
+        callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            callback()
+
+
+def segments(*texts):
+    return tuple(TranscriptSegment(id, "You", text, START) for id, text in texts)
+
+
+def apply_edits(lines, edits):
+    lines = list(lines)
+    for start, end, new_lines in edits:
+        lines[start:end] = new_lines
+    return lines
+
+
+class DiffSegmentsTest(unittest.TestCase):
+    def test_edits(self):
+        old = segments((2, "c"), (1, "b"), (0, "a"))
+        self.assertEqual(diff_segments(old, old), [])
+        # a new segment, and a replaced one that keeps its id
+        new = segments((3, "d"), (2, "c2"), (1, "b"), (0, "a"))
+        self.assertEqual(diff_segments(old, new), [(0, 1, ("You: [d]\n\n", "You: [c2]\n\n"))])
+        self.assertEqual(diff_segments(old, ()), [(0, 3, ())])
+
+    def test_edits_apply_in_order(self):
+        rng = random.Random(0)
+        for _ in range(500):
+            old = segments(*((id, rng.choice("abc")) for id in sorted(rng.sample(range(12), rng.randrange(8)))))
+            new = segments(*((id, rng.choice("abc")) for id in sorted(rng.sample(range(12), rng.randrange(8)))))
+            edits = diff_segments(old, new)
+            self.assertEqual([start for start, _, _ in edits], sorted((start for start, _, _ in edits), reverse=True))
+            self.assertEqual(apply_edits([s.line for s in old], edits), [s.line for s in new])
+
+
+class TranscriptRendererTest(unittest.TestCase):
+    def test_textbox_follows_the_transcript(self):
+        rng = random.Random(0)
+        store = TranscriptStore(("You", "Speaker"), 5, None)
+        store.add("You", "before the window", START)
+        root, textbox = FakeRoot(), FakeTextbox()
+        TranscriptRenderer(root, textbox, store)
+
+        for step in range(2000):
+            seconds_spoken = START + timedelta(seconds=step)
+            who_spoke = rng.choice(("You", "Speaker"))
+            operation = rng.random()
+            # some results span several lines
+            text = "\n".join(f"phrase {step}" for _ in range(rng.choice((1, 1, 1, 2, 3))))
+            if operation < 0.4:
+                store.add(who_spoke, text, seconds_spoken)
+            elif operation < 0.95:
+                store.replace_last(who_spoke, text, seconds_spoken)
+            else:
+                store.clear()
+            # the Tk thread only gets to render now and then
+            if rng.random() < 0.3:
+                root.run_callbacks()
+                self.assertEqual(textbox.text, store.get_text(), f"step {step}")
+        root.run_callbacks()
+        self.assertEqual(textbox.text, store.get_text())
+
+    def test_changes_never_call_into_tk(self):
+        store = TranscriptStore(("You",), 5, None)
+        root, textbox = FakeRoot(), FakeTextbox()
+        TranscriptRenderer(root, textbox, store)
+        self.assertEqual(len(root.callbacks), 1)
+        for i in range(10):
+            store.add("You", f"phrase {i}", START + timedelta(seconds=i))
+        self.assertEqual(len(root.callbacks), 1)
+        self.assertEqual(textbox.text, "")
+        root.run_callbacks()
+        self.assertEqual(textbox.text, store.get_text())
+        self.assertEqual(len(root.callbacks), 1)
+
+    def test_listeners_run_without_the_lock(self):
+        store = TranscriptStore(("You",), 5, None)
+        acquired = []
+
+        # like the Tk thread exporting the transcript while the renderer's listener waits for it
+        def listener(base_version, snapshot, changes):
+            acquired.append(store.lock.acquire(timeout=1))
+            store.lock.release()
+        store.subscribe(listener)
+        store.add("You", "phrase", START)
+        store.replace_last("You", "phrase", START)
+        store.clear()
+        self.assertEqual(acquired, [True] * 3)
+
+
+if __name__ == "__main__":
+    unittest.main()